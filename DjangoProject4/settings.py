@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'library.middleware.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -155,13 +156,115 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth_api.authentication.CachedJWTAuthentication',
     ),
+    # Reverse proxies in front of the app. Throttles key clients on the address this many hops back
+    # in X-Forwarded-For; with 0 the header, which clients can set freely, is ignored for REMOTE_ADDR.
+    'NUM_PROXIES': int(os.environ.get('DJANGO_NUM_PROXIES') or 0),
 }
 
+AUTHENTICATION_BACKENDS = [
+    'auth_api.backends.PooledModelBackend',
+]
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(hours=24),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Rotated refresh tokens are revoked in auth_api.revocation rather than the token_blacklist app
+    'TOKEN_REFRESH_SERIALIZER': 'auth_api.serializers.TokenRefreshSerializer',
+}
+
+# Seconds an authenticated user stays cached between token checks. Saving or deleting the user drops it.
+AUTH_API_USER_CACHE_TTL = 300
+
+# Revoked refresh token jtis the in-memory filter holds before it is rebuilt, and its false positive rate.
+# False positives only cost a lookup in the revoked_tokens table.
+AUTH_API_REVOCATION_FILTER_CAPACITY = 1_000_000
+AUTH_API_REVOCATION_FILTER_ERROR_RATE = 0.001
+
+# Password hashing for register and login runs on this many threads, with at most QUEUE_DEPTH more
+# requests waiting; the rest get a 503. 0 hashes inline in the request thread.
+AUTH_API_HASHING_WORKERS = 2
+AUTH_API_HASHING_QUEUE_DEPTH = 16
+
+# Token buckets of register and login, as (burst, refill per second), per client IP and per username
+AUTH_API_THROTTLE_RATES = {
+    'ip': (20, 0.5),
+    'username': (5, 0.1),
+}
+
+# Keyset pagination of library listings
+LIBRARY_PAGE_SIZE = 100
+LIBRARY_MAX_PAGE_SIZE = 1000
+
+# Rows fetched per round trip when streaming the catalog export
+LIBRARY_EXPORT_CHUNK_SIZE = 2000
+
+# Batch book ingestion
+LIBRARY_BATCH_MAX_BOOKS = 10000
+LIBRARY_BULK_BATCH_SIZE = 500
+
+# Seconds the "my current borrows" listing stays cached, it is also dropped on every borrow/return
+LIBRARY_USER_BORROWS_CACHE_TTL = 300
+
+# Seconds a rendered catalog page stays cached under the current catalog version
+LIBRARY_CATALOG_CACHE_TTL = 600
+
+# Seconds a request waits for another worker to fill a cold cache entry before computing it itself
+LIBRARY_SINGLE_FLIGHT_TIMEOUT = 10
+LIBRARY_SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+# In-process autocomplete index over titles and authors
+LIBRARY_AUTOCOMPLETE_MAX_ENTRIES = 500000
+# Estimated memory the index may take; books past it are left out of suggestions, with a warning
+LIBRARY_AUTOCOMPLETE_MAX_BYTES = 128 * 1024 * 1024
+LIBRARY_AUTOCOMPLETE_REFRESH_INTERVAL = 300
+LIBRARY_AUTOCOMPLETE_LIMIT = 10
+LIBRARY_AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Seconds availability answers may be served from cache, 0 always reads the database
+LIBRARY_AVAILABILITY_CACHE_TTL = 0
+
+# Seconds the change feed holds back fresh changes. SQLite commits one writer at a time, so 0 is safe there.
+# Elsewhere concurrent transactions can commit sequence numbers out of order, and the window has to outlast the
+# longest catalog write transaction; check library.E001 refuses 0 on those databases.
+LIBRARY_CHANGE_FEED_SETTLE_SECONDS = 0 if DATABASES['default']['ENGINE'].endswith('sqlite3') else 5
+
+# Days prune_catalog_changes keeps in the change feed; readers further behind get 410 and resync
+LIBRARY_CHANGE_FEED_RETENTION_DAYS = 30
+
+# Peak allocation per request in Server-Timing. Runs tracemalloc, which slows Python down noticeably.
+LIBRARY_TRACE_ALLOCATIONS = os.environ.get('LIBRARY_TRACE_ALLOCATIONS', '').lower() == 'true'
+
+# Where staff requests sent with "X-Profile: 1" leave their cProfile stats
+LIBRARY_PROFILE_DIR = os.environ.get('LIBRARY_PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
+# Directory where every worker process keeps its /metrics counters. Share it between the workers of a
+# server and clear it when the server starts. Unset, each process uses a temporary one of its own.
+LIBRARY_METRICS_DIR = os.environ.get('LIBRARY_METRICS_DIR')
+
+# Queries from these modules (or from requests to their views) slower than THRESHOLD seconds are logged with their
+# plan by library.slow_queries, once per fingerprint per LOG_INTERVAL seconds; None disables the log.
+# The slow_queries command prints the aggregates the processes keep in SLOW_QUERY_DIR.
+LIBRARY_SLOW_QUERY_THRESHOLD = 0.2
+LIBRARY_SLOW_QUERY_MODULES = ['library.services.books', 'library.views']
+LIBRARY_SLOW_QUERY_LOG_INTERVAL = 60
+LIBRARY_SLOW_QUERY_MAX_FINGERPRINTS = 1000
+LIBRARY_SLOW_QUERY_DIR = os.environ.get('LIBRARY_SLOW_QUERY_DIR', str(BASE_DIR / 'slow_queries'))
+
+# Per-request timing records of library.requests are logged at INFO
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'library': {
+            'handlers': ['console'],
+            'level': os.environ.get('DJANGO_LOG_LEVEL', 'WARNING'),
+        },
+    },
 }
@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from library.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth_api/', include('auth_api.urls')),
-    path('api/', include('library.urls'))
+    path('api/', include('library.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
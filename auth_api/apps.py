@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'auth_api'
+
+    def ready(self):
+        from auth_api.authentication import user_changed
+        post_save.connect(user_changed, sender=get_user_model(), dispatch_uid='auth_api.user_changed')
+        post_delete.connect(user_changed, sender=get_user_model(), dispatch_uid='auth_api.user_deleted')
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from auth_api.hashing import hash_password, needs_rehash, verify_password
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend that verifies passwords on the bounded hashing pool instead of the request thread."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway so a missing user takes as long as a wrong password (#20760)
+            hash_password(password)
+            return
+        if not user.has_usable_password() or not verify_password(password, user.password):
+            return
+        if needs_rehash(user.password):
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        if self.user_can_authenticate(user):
+            return user
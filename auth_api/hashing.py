@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from rest_framework.exceptions import APIException
+
+T = TypeVar('T')
+
+
+class HashingBusy(APIException):
+    status_code = 503
+    default_detail = 'Too many sign-ins in progress, try again shortly.'
+    default_code = 'hashing_busy'
+
+
+class HashingPool:
+    """
+    Runs password hashing on at most AUTH_API_HASHING_WORKERS threads, with at most
+    AUTH_API_HASHING_QUEUE_DEPTH more calls waiting. Further calls fail fast with HashingBusy instead
+    of piling up. PBKDF2 releases the GIL, so the worker count is the number of cores a burst of
+    sign-ups can take away from the rest of the site. With 0 workers hashing runs inline, unbounded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+
+    def run(self, fn: Callable[..., T], *args) -> T:
+        workers = settings.AUTH_API_HASHING_WORKERS
+        if not workers:
+            return fn(*args)
+        executor, slots = self._get(workers)
+        if not slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            slots.release()
+
+    def _get(self, workers: int) -> tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+                self._slots = threading.BoundedSemaphore(workers + settings.AUTH_API_HASHING_QUEUE_DEPTH)
+            return self._executor, self._slots
+
+
+pool = HashingPool()
+
+
+def hash_password(password: str) -> str:
+    return pool.run(make_password, password)
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    return pool.run(check_password, password, encoded)
+
+
+def needs_rehash(encoded: str) -> bool:
+    try:
+        return identify_hasher(encoded).must_update(encoded)
+    except ValueError:
+        return False
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from auth_api.revocation import revocations
+
+
+class Command(BaseCommand):
+    help = 'Deletes revoked refresh tokens that have expired anyway.'
+
+    def handle(self, *args, **options):
+        deleted = revocations.prune()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} expired revoked tokens'))
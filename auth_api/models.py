@@ -1,3 +1,22 @@
 from django.db import models
 
-# Create your models here.
+
+class RevokedToken(models.Model):
+    """
+    Refresh tokens that may not be used again, by jti. Source of truth for auth_api.revocation;
+    rows are useless once the token expires and are removed by prune_revoked_tokens.
+    """
+    id = models.BigAutoField(primary_key=True)
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.jti} (expires {self.expires_at})"
+
+    class Meta:
+        db_table = 'revoked_tokens'
+        indexes = [
+            # Pruning deletes by expiry
+            models.Index(fields=['expires_at'], name='revoked_tokens_by_expiry'),
+        ]
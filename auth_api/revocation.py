@@ -0,0 +1,133 @@
+import datetime
+import hashlib
+import math
+import threading
+import time
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from auth_api.models import RevokedToken
+
+REVOCATIONS_VERSION_KEY = 'auth_api:revocations_version'
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership test with no false negatives and about error_rate false positives
+    once capacity keys are in. A million jtis at 0.1% take under 2 MB.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationStore:
+    """
+    Revoked jtis: the RevokedToken table is the source of truth, a per-process Bloom filter of the
+    unexpired rows answers the common "not revoked" case without a query.
+
+    The filter catches up with rows added by other processes when the revocations version in the
+    Django cache moves, so workers need a shared cache backend to see each other's revocations
+    (the same requirement as catalog caching). It is rebuilt from scratch once it gets full or older
+    than the refresh token lifetime, which drops the jtis that expired in the meantime. A rebuilt filter
+    holds at least twice the unexpired rows, so it is never full on arrival.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter: Optional[BloomFilter] = None
+        self._last_id = 0
+        self._version = None
+        self._built_at = 0.0
+
+    def is_revoked(self, jti: str) -> bool:
+        self._sync()
+        if jti not in self._filter:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti: str, expires_at: datetime.datetime) -> bool:
+        """Records jti as revoked. Returns False when it already was, e.g. a refresh token used twice."""
+        try:
+            with transaction.atomic():
+                row = RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        transaction.on_commit(lambda: self._added(row))
+        return True
+
+    def prune(self) -> int:
+        """Deletes rows of expired tokens and rebuilds the filter. Returns the number of rows deleted."""
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        with self._lock:
+            self._filter = None
+        return deleted
+
+    def _added(self, row: RevokedToken) -> None:
+        try:
+            version = cache.incr(REVOCATIONS_VERSION_KEY)
+        except ValueError:
+            cache.add(REVOCATIONS_VERSION_KEY, time.time_ns(), timeout=None)
+            return
+        with self._lock:
+            if self._filter is None:
+                return
+            self._filter.add(row.jti)
+            if self._version is not None and version == self._version + 1:
+                # Nobody else revoked anything since the last sync, no need to catch up
+                self._version = version
+                self._last_id = max(self._last_id, row.id)
+
+    def _sync(self) -> None:
+        version = cache.get(REVOCATIONS_VERSION_KEY)
+        if version is None:
+            cache.add(REVOCATIONS_VERSION_KEY, time.time_ns(), timeout=None)
+            version = cache.get(REVOCATIONS_VERSION_KEY)
+        if self._filter is not None and version == self._version and not self._stale():
+            return
+        with self._lock:
+            if self._filter is None or self._stale():
+                # Sized for twice the live rows, so a table past the configured capacity doesn't make
+                # every rebuilt filter stale again straight away
+                live = RevokedToken.objects.filter(expires_at__gt=timezone.now()).count()
+                self._filter = BloomFilter(max(settings.AUTH_API_REVOCATION_FILTER_CAPACITY, 2 * live),
+                                           settings.AUTH_API_REVOCATION_FILTER_ERROR_RATE)
+                self._last_id = 0
+                self._built_at = time.monotonic()
+            rows = (RevokedToken.objects
+                    .filter(id__gt=self._last_id, expires_at__gt=timezone.now())
+                    .order_by('id')
+                    .values_list('id', 'jti'))
+            for row_id, jti in rows.iterator():
+                self._filter.add(jti)
+                self._last_id = row_id
+            self._version = version
+
+    def _stale(self) -> bool:
+        lifetime = api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+        return self._filter.count > self._filter.capacity or time.monotonic() - self._built_at > lifetime
+
+
+revocations = RevocationStore()
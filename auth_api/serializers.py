@@ -0,0 +1,33 @@
+from typing import Any
+
+from rest_framework_simplejwt import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from auth_api.authentication import CachedJWTAuthentication
+from auth_api.tokens import RevocableRefreshToken
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    """
+    Refreshes with RevocableRefreshToken and resolves the token's user through the same cache as
+    request authentication, so a refresh costs a single INSERT into the revocation table.
+    """
+    token_class = RevocableRefreshToken
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, str]:
+        refresh = self.token_class(attrs['refresh'])
+        try:
+            CachedJWTAuthentication().get_user(refresh)
+        except AuthenticationFailed:
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
@@ -1,12 +1,27 @@
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
+import datetime
+import io
+import threading
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from auth_api.hashing import HashingBusy, HashingPool
+from auth_api.models import RevokedToken
+from auth_api.revocation import BloomFilter, revocations
 
 
 class BaseTestCase(APITestCase):
     def setUp(self):
+        # Throttle buckets and cached users live in the cache
+        cache.clear()
         self.test_user_data = {
             'username': 'testuser',
             'password': 'testpass123',
@@ -67,3 +82,182 @@ class PingAPITest(BaseTestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, {'message': 'pong'})
+
+    async def test_async_ping(self):
+        user = await User.objects.acreate(username='pinger')
+        token = AccessToken.for_user(user)
+        response = await self.async_client.get(reverse('async ping'), headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'message': 'pong'})
+
+        response = await self.async_client.get(reverse('async ping'), headers={'Authorization': 'Bearer nonsense'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CachedJWTAuthenticationTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='reader123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def _staff_only(self):
+        return self.client.get(reverse('list borrows view'))
+
+    def test_user_resolved_from_cache(self):
+        self.assertEqual(self.client.get(reverse('ping')).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('ping')).status_code, status.HTTP_200_OK)
+
+    def test_deactivation_invalidates_cache(self):
+        self.client.get(reverse('ping'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('ping')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_staff_flag_change_applies(self):
+        self.assertEqual(self._staff_only().status_code, status.HTTP_403_FORBIDDEN)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save()
+        self.assertEqual(self._staff_only().status_code, status.HTTP_200_OK)
+
+    def test_deleted_user_rejected(self):
+        self.client.get(reverse('ping'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get(reverse('ping')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenRevocationTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        revocations.prune()
+        self.user = User.objects.create_user(username='reader', password='reader123')
+
+    def _refresh(self, token):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('token_refresh'), {'refresh': str(token)}, format='json')
+
+    def test_rotated_token_is_revoked(self):
+        token = RefreshToken.for_user(self.user)
+
+        response = self._refresh(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('refresh', response.data)
+        self.assertEqual(self._refresh(token).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._refresh(response.data['refresh']).status_code, status.HTTP_200_OK)
+
+    def test_refresh_skips_revocation_lookup(self):
+        self._refresh(RefreshToken.for_user(self.user))
+        token = RefreshToken.for_user(self.user)
+        with self.assertNumQueries(3):
+            # Savepoint, INSERT of the rotated jti, savepoint release; no SELECT of users or revoked tokens
+            self.assertEqual(self._refresh(token).status_code, status.HTTP_200_OK)
+
+    def test_inactive_user_cannot_refresh(self):
+        token = RefreshToken.for_user(self.user)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self._refresh(token).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_seen_by_other_processes(self):
+        token = RefreshToken.for_user(self.user)
+        self._refresh(RefreshToken.for_user(self.user))
+        # Another worker revokes the token; the version bump tells this one to catch up
+        RevokedToken.objects.create(jti=token['jti'], expires_at=timezone.now() + datetime.timedelta(days=1))
+        cache.incr('auth_api:revocations_version')
+
+        self.assertEqual(self._refresh(token).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prune_command(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti='expired', expires_at=now - datetime.timedelta(seconds=1))
+        RevokedToken.objects.create(jti='live', expires_at=now + datetime.timedelta(days=1))
+
+        call_command('prune_revoked_tokens', stdout=io.StringIO())
+
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertTrue(revocations.is_revoked('live'))
+        self.assertFalse(revocations.is_revoked('expired'))
+
+    @override_settings(AUTH_API_REVOCATION_FILTER_CAPACITY=2)
+    def test_filter_sized_for_live_rows(self):
+        expires_at = timezone.now() + datetime.timedelta(days=1)
+        RevokedToken.objects.bulk_create([RevokedToken(jti=f'live-{i}', expires_at=expires_at) for i in range(3)])
+        revocations.prune()
+
+        self.assertTrue(revocations.is_revoked('live-0'))
+        with self.assertNumQueries(0):
+            # Over the configured capacity, yet no rebuild on every check
+            for _ in range(5):
+                revocations.is_revoked('unknown')
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class PasswordHashingTest(BaseTestCase):
+    def _login(self, password):
+        return self.client.post(reverse('token_obtain_pair'), {'username': 'reader', 'password': password},
+                                format='json')
+
+    def test_login_verifies_on_pool(self):
+        User.objects.create_user(username='reader', password='reader123')
+        self.assertEqual(self._login('reader123').status_code, status.HTTP_200_OK)
+        self.assertEqual(self._login('wrong').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_registered_password_is_hashed(self):
+        self.client.post(reverse('register'), self.test_user_data, format='json')
+        self.assertTrue(User.objects.get(username='testuser').check_password('testpass123'))
+
+    @override_settings(AUTH_API_HASHING_WORKERS=1, AUTH_API_HASHING_QUEUE_DEPTH=0)
+    def test_full_pool_fails_fast(self):
+        hashing = HashingPool()
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        worker = threading.Thread(target=hashing.run, args=(block,))
+        worker.start()
+        started.wait()
+        try:
+            with self.assertRaises(HashingBusy):
+                hashing.run(lambda: None)
+        finally:
+            release.set()
+            worker.join()
+        self.assertEqual(hashing.run(lambda: 42), 42)
+
+
+@override_settings(AUTH_API_THROTTLE_RATES={'ip': (3, 0.001), 'username': (2, 0.001)})
+class AuthThrottlingTest(BaseTestCase):
+    def test_register_throttled_per_ip(self):
+        url = reverse('register')
+        statuses = [self.client.post(url, {'username': f'user{i}', 'password': 'passwd123'}, format='json').status_code
+                    for i in range(4)]
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * 3 + [status.HTTP_429_TOO_MANY_REQUESTS])
+
+    def test_forwarded_for_does_not_reset_ip_bucket(self):
+        url = reverse('register')
+        statuses = [self.client.post(url, {'username': f'user{i}', 'password': 'passwd123'}, format='json',
+                                     HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code
+                    for i in range(4)]
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * 3 + [status.HTTP_429_TOO_MANY_REQUESTS])
+
+    def test_login_throttled_per_username(self):
+        url = reverse('token_obtain_pair')
+        responses = [self.client.post(url, {'username': 'victim', 'password': 'guess'}, format='json',
+                                      REMOTE_ADDR=f'10.0.0.{i}') for i in range(3)]
+        self.assertEqual([response.status_code for response in responses],
+                         [status.HTTP_401_UNAUTHORIZED] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS])
+        self.assertIn('Retry-After', responses[-1])
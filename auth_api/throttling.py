@@ -0,0 +1,54 @@
+import hashlib
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per client key: bursts of up to `burst` requests pass, then `rate` requests per second.
+    Buckets live in the Django cache, so workers share them when the cache is shared. Their read-modify-write
+    isn't atomic, so concurrent requests can occasionally get one token more than the bucket had.
+    """
+    scope = None
+
+    def get_key(self, request, view) -> Optional[str]:
+        raise NotImplementedError
+
+    def allow_request(self, request, view) -> bool:
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        burst, rate = settings.AUTH_API_THROTTLE_RATES[self.scope]
+        cache_key = f'auth_api:throttle:{self.scope}:{hashlib.sha1(key.encode()).hexdigest()}'
+        now = time.time()
+        tokens, updated_at = cache.get(cache_key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        self._wait = None
+        if tokens < 1:
+            self._wait = (1 - tokens) / rate
+            return False
+        # Keep the bucket until it would be full again anyway
+        cache.set(cache_key, (tokens - 1, now), timeout=max(1, int(burst / rate) + 1))
+        return True
+
+    def wait(self) -> Optional[float]:
+        return self._wait
+
+
+class ClientIPThrottle(TokenBucketThrottle):
+    scope = 'ip'
+
+    def get_key(self, request, view) -> Optional[str]:
+        return self.get_ident(request)
+
+
+class UsernameThrottle(TokenBucketThrottle):
+    scope = 'username'
+
+    def get_key(self, request, view) -> Optional[str]:
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        return str(username).lower() if username else None
@@ -0,0 +1,26 @@
+import datetime
+
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from auth_api.revocation import revocations
+
+
+class RevocableRefreshToken(RefreshToken):
+    """
+    RefreshToken checked against auth_api.revocation instead of the token_blacklist app.
+    Provides blacklist(), so simplejwt's BLACKLIST_AFTER_ROTATION revokes the old token on refresh.
+    """
+
+    def verify(self) -> None:
+        super().verify()
+        if revocations.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError('Token is blacklisted')
+
+    def blacklist(self) -> None:
+        expires_at = datetime.datetime.fromtimestamp(self.payload['exp'], tz=datetime.timezone.utc)
+        # The unique jti makes this the check that matters: of two concurrent refreshes with
+        # the same token, only one gets to revoke it.
+        if not revocations.revoke(self.payload[api_settings.JTI_CLAIM], expires_at):
+            raise TokenError('Token is blacklisted')
@@ -1,14 +1,15 @@
 ﻿from django.urls import path
-from rest_framework_simplejwt.views import token_obtain_pair, token_refresh
+from rest_framework_simplejwt.views import token_refresh
 
-from auth_api.views import register, ping
+from auth_api.views import register, ping, ping_async, ThrottledTokenObtainPairView
 
 urlpatterns = [
     # Registration
     path('register/', register, name='register'),
     path('ping/', ping, name='ping'),
+    path('async/ping/', ping_async, name='async ping'),
 
     # JWT built-in endpoints
-    path('token/', token_obtain_pair, name='token_obtain_pair'),
+    path('token/', ThrottledTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', token_refresh, name='token_refresh'),
 ]
\ No newline at end of file
@@ -1,12 +1,19 @@
-from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from auth_api.authentication import async_jwt_view
+from auth_api.hashing import hash_password
+from auth_api.throttling import ClientIPThrottle, UsernameThrottle
 
 
 @api_view(['POST'])
+@throttle_classes([ClientIPThrottle, UsernameThrottle])
 def register(request):
     """Register a new user and return a JWT pair."""
     username = request.data.get("username")
@@ -22,7 +29,7 @@ def register(request):
     if User.objects.filter(username=username).exists():
         return Response({"error": "User already exists."}, status=status.HTTP_400_BAD_REQUEST)
 
-    user = User(username=username, password=make_password(password))
+    user = User(username=username, password=hash_password(password))
     user.save()
 
     refresh = RefreshToken.for_user(user)
@@ -32,7 +39,19 @@ def register(request):
     }, status=status.HTTP_201_CREATED)
 
 
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    """token_obtain_pair with the same limits as register; the password check runs on the hashing pool."""
+    throttle_classes = [ClientIPThrottle, UsernameThrottle]
+
+
 @api_view(['GET'])
 def ping(request):
     """Веб-сервис, позволяющий проверить корректность работы Token-based авторизации."""
     return Response({'message': 'pong'}, status=status.HTTP_200_OK)
+
+
+@require_GET
+@async_jwt_view
+async def ping_async(request):
+    """Async ping: checks the token without taking a worker thread under ASGI."""
+    return JsonResponse({'message': 'pong'}, status=status.HTTP_200_OK)
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class LibraryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'library'
+
+    def ready(self):
+        # Registers the system checks
+        from library import checks
+
+        from library.services.search import ensure_search_triggers
+        post_migrate.connect(ensure_search_triggers, sender=self)
+
+        from library.middleware import install_query_timer
+        connection_created.connect(install_query_timer, dispatch_uid='library.install_query_timer')
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, register
+from django.db import connections
+
+
+@register()
+def check_change_feed_settle_window(app_configs, **kwargs) -> list[Error]:
+    """Only SQLite commits change feed sequence numbers in order; other databases need a settle window."""
+    if settings.LIBRARY_CHANGE_FEED_SETTLE_SECONDS > 0:
+        return []
+    return [
+        Error(
+            f'LIBRARY_CHANGE_FEED_SETTLE_SECONDS is 0 but database "{alias}" is {connections[alias].vendor}.',
+            hint='Concurrent transactions can commit change feed rows out of order there; set it to more than the '
+                 'longest catalog write transaction takes, in seconds.',
+            id='library.E001',
+        )
+        for alias in connections
+        if connections[alias].vendor != 'sqlite'
+    ]
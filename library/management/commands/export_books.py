@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from library.services.export import EXPORT_FORMATS, export_books
+
+
+class Command(BaseCommand):
+    help = 'Streams the whole book catalog as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', '-o', help='File to write to. Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows fetched per round trip. Defaults to LIBRARY_EXPORT_CHUNK_SIZE.')
+
+    def handle(self, *args, **options):
+        lines = export_books(options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+                out.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,51 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library.services.imports import IMPORT_FORMATS, guess_format, iter_import_batches, iter_records, open_source
+
+
+class Command(BaseCommand):
+    help = ('Imports books from a CSV or NDJSON file (optionally gzipped) in fixed-size batches. '
+            'Existing books get their copies increased. An interrupted import resumes after the last committed batch.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('file')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='Defaults to the file extension (.csv, .ndjson, .jsonl, optionally .gz).')
+        parser.add_argument('--batch-size', type=int, default=settings.LIBRARY_BULK_BATCH_SIZE,
+                            help='Records committed per transaction. Defaults to LIBRARY_BULK_BATCH_SIZE.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint of a previous run and import the whole file again.')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        import_format = options['format'] or guess_format(path)
+        if import_format is None:
+            raise CommandError('Cannot guess the file format, pass --format')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if not os.path.isfile(path):
+            raise CommandError(f'{path} does not exist')
+
+        started = time.perf_counter()
+        resumed_at = None
+        done = imported = failed = 0
+        with open_source(path) as stream:
+            batches = iter_import_batches(os.path.abspath(path), iter_records(stream, import_format),
+                                          options['batch_size'], options['restart'])
+            for done, batch_imported, errors in batches:
+                if resumed_at is None:
+                    resumed_at = done - batch_imported - len(errors)
+                    if resumed_at:
+                        self.stdout.write(f'Resuming after record {resumed_at}')
+                imported += batch_imported
+                failed += len(errors)
+                for number, message in errors:
+                    self.stderr.write(f'record {number}: {message}')
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{done} records, {(done - resumed_at) / elapsed:.0f} records/s')
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} books, {failed} records rejected'))
@@ -0,0 +1,21 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library.services.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Deletes change feed entries older than the retention period. Readers further behind must resync.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Days of changes to keep (default LIBRARY_CHANGE_FEED_RETENTION_DAYS)')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.LIBRARY_CHANGE_FEED_RETENTION_DAYS
+        if days < 1:
+            raise CommandError('--days must be at least 1')
+        deleted = prune_changes(datetime.timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} catalog changes older than {days} days'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from library.services.borrows import reconcile_on_loan
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the on_loan counter of every book from open borrows.'
+
+    def handle(self, *args, **options):
+        updated = reconcile_on_loan()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled on_loan for {updated} books'))
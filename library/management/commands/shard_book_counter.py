@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library.models import Book
+from library.services.inventory import shard_counter
+
+
+class Command(BaseCommand):
+    help = 'Splits the on_loan counter of a hot book across several rows, or merges it back with --slots 0.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('isbn')
+        parser.add_argument('--slots', type=int, required=True,
+                            help='Number of counter rows to spread the book over. 0 disables sharding.')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['slots'] <= 64:
+            raise CommandError('--slots must be between 0 and 64')
+        try:
+            book = shard_counter(options['isbn'], options['slots'])
+        except Book.DoesNotExist:
+            raise CommandError(f'Book {options["isbn"]} not found')
+        if book.counter_slots:
+            self.stdout.write(self.style.SUCCESS(f'{book.isbn} now counts loans over {book.counter_slots} slots'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{book.isbn} now counts loans on the book row'))
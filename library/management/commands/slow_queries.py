@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from library.slowqueries import clear_saved, load_all
+
+ORDERS = {
+    'total': lambda query: query.total,
+    'count': lambda query: query.count,
+    'max': lambda query: query.max,
+}
+
+
+class Command(BaseCommand):
+    help = 'Prints the slow query fingerprints that cost the most, merged over all server processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Number of fingerprints to print')
+        parser.add_argument('--order', choices=ORDERS, default='total',
+                            help='Rank by total time, number of occurrences or slowest occurrence')
+        parser.add_argument('--plans', action='store_true', help='Print the last query plan of each fingerprint')
+        parser.add_argument('--clear', action='store_true', help='Delete the saved aggregates instead')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            removed = clear_saved()
+            self.stdout.write(self.style.SUCCESS(f'Removed slow query aggregates of {removed} processes'))
+            return
+
+        queries = sorted(load_all(), key=ORDERS[options['order']], reverse=True)[:options['top']]
+        if not queries:
+            self.stdout.write('No slow queries recorded')
+            return
+        for query in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{query.fingerprint}  {query.count}x  total {query.total * 1000:.1f}ms  '
+                f'avg {query.total / query.count * 1000:.1f}ms  max {query.max * 1000:.1f}ms'))
+            if query.views:
+                self.stdout.write(f'  views: {", ".join(query.views)}')
+            if query.callers:
+                self.stdout.write(f'  callers: {", ".join(query.callers)}')
+            self.stdout.write(f'  {query.sql}')
+            if options['plans'] and query.plan:
+                for line in query.plan.splitlines():
+                    self.stdout.write(f'    {line}')
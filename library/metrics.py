@@ -0,0 +1,248 @@
+"""
+Prometheus metrics without a client library.
+
+Every process adds to its own memory-mapped file in LIBRARY_METRICS_DIR, so recording takes no
+cross-process lock, and /metrics sums the files of all processes. Recording a counter is a dict lookup
+and an 8-byte read-modify-write under a per-process lock, about two microseconds; a histogram
+observation updates three samples under one lock, about four. Files of exited processes are kept so counters never go backwards: clear the
+directory when the server starts, as with prometheus_client's multiprocess mode.
+"""
+
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+_header = struct.Struct('<Q')
+_length = struct.Struct('<I')
+_value = struct.Struct('<d')
+INITIAL_SIZE = 64 * 1024
+
+
+class MetricsFile:
+    """
+    Append-only map of sample key to float in a memory-mapped file: an 8-byte used-size header, then
+    entries of a 4-byte key length, the UTF-8 key padded to 8 bytes and an 8-byte double.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = _header.unpack_from(self._map, 0)[0] or _header.size
+        self._positions = {key: position for key, position, _ in self._entries()}
+
+    def add(self, key: str, amount: float) -> None:
+        position = self._positions.get(key)
+        if position is None:
+            position = self._append(key)
+        _value.pack_into(self._map, position, _value.unpack_from(self._map, position)[0] + amount)
+
+    def _append(self, key: str) -> int:
+        encoded = key.encode()
+        padded = len(encoded) + (-(_length.size + len(encoded)) % 8)
+        size = _length.size + padded + _value.size
+        while self._used + size > len(self._map):
+            self._map.close()
+            self._file.truncate(os.fstat(self._file.fileno()).st_size * 2)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        _length.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + _length.size:self._used + _length.size + len(encoded)] = encoded
+        position = self._used + _length.size + padded
+        _value.pack_into(self._map, position, 0.0)
+        # Publish the entry only once it is complete, readers stop at the used size
+        self._used += size
+        _header.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def _entries(self) -> Iterable[tuple[str, int, float]]:
+        return read_entries(self._map, self._used)
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+def read_entries(data, used: Optional[int] = None) -> Iterable[tuple[str, int, float]]:
+    if used is None:
+        used = _header.unpack_from(data, 0)[0]
+    position = _header.size
+    while position < used:
+        length = _length.unpack_from(data, position)[0]
+        key = bytes(data[position + _length.size:position + _length.size + length]).decode()
+        position += _length.size + length + (-(_length.size + length) % 8)
+        yield key, position, _value.unpack_from(data, position)[0]
+        position += _value.size
+
+
+class Store:
+    """This process's metrics file, reopened after a fork so each process writes its own."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file: Optional[MetricsFile] = None
+        self._private_directory: Optional[str] = None
+
+    def directory(self) -> str:
+        if settings.LIBRARY_METRICS_DIR:
+            return settings.LIBRARY_METRICS_DIR
+        if self._private_directory is None:
+            # Without a shared directory each process only exports its own metrics
+            self._private_directory = tempfile.mkdtemp(prefix='library-metrics-')
+        return self._private_directory
+
+    def add(self, *samples: tuple[str, float]) -> None:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            for key, amount in samples:
+                self._file.add(key, amount)
+
+    def _open(self) -> None:
+        os.makedirs(self.directory(), exist_ok=True)
+        self._pid = os.getpid()
+        self._file = MetricsFile(os.path.join(self.directory(), f'{self._pid}.db'))
+
+    def reset(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._pid = self._file = None
+
+    def collect(self) -> dict[str, float]:
+        totals = defaultdict(float)
+        for path in glob.glob(os.path.join(self.directory(), '*.db')):
+            with open(path, 'rb') as file:
+                data = file.read()
+            if len(data) < _header.size:
+                continue
+            for key, _, value in read_entries(data):
+                totals[key] += value
+        return totals
+
+
+store = Store()
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._keys: dict[tuple, str] = {}
+        registry.append(self)
+
+    def _key(self, suffix: str, labels: tuple, extra: tuple = ()) -> str:
+        cache_key = (suffix, labels, extra)
+        key = self._keys.get(cache_key)
+        if key is None:
+            key = json.dumps([self.name, suffix, list(zip(self.labelnames, map(str, labels))) + list(extra)])
+            self._keys[cache_key] = key
+        return key
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        store.add((self._key('_total', labels), amount))
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value: float, *labels) -> None:
+        # Buckets are stored per bucket and made cumulative when exported
+        bound = self.buckets[bisect.bisect_left(self.buckets, value)]
+        store.add((self._key('_bucket', labels, (('le', bound),)), 1),
+                  (self._key('_sum', labels), value),
+                  (self._key('_count', labels), 1))
+
+
+registry: list[Metric] = []
+
+
+def render() -> str:
+    """All metrics of all processes in the Prometheus text exposition format."""
+    samples = defaultdict(list)
+    for key, value in store.collect().items():
+        name, suffix, labels = json.loads(key)
+        samples[name].append((suffix, labels, value))
+
+    lines = []
+    for metric in registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        rows = samples.get(metric.name, [])
+        if isinstance(metric, Histogram):
+            rows = _cumulative(rows)
+        for suffix, labels, value in sorted(rows, key=lambda row: (row[1][:len(metric.labelnames)], row[0])):
+            lines.append(f'{metric.name}{suffix}{_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _cumulative(rows: list) -> list:
+    buckets = defaultdict(dict)
+    others = []
+    for suffix, labels, value in rows:
+        if suffix == '_bucket':
+            *series, (_, bound) = labels
+            buckets[json.dumps(series)][bound] = value
+        else:
+            others.append((suffix, labels, value))
+    for series, counts in buckets.items():
+        total = 0.0
+        for bound in sorted(counts):
+            total += counts[bound]
+            others.append(('_bucket', json.loads(series) + [['le', bound]], total))
+    return others
+
+
+def _labels(labels: list) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value if not isinstance(value, float) else _number(value))
+               .replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(int(value)) if value == int(value) else repr(value)
+
+
+REQUESTS = Counter('library_http_requests', 'HTTP requests by view, method and status.', ('view', 'method', 'status'))
+REQUEST_DURATION = Histogram('library_http_request_duration_seconds', 'Request latency by view.', ('view',))
+REQUEST_QUERIES = Histogram('library_http_request_db_queries', 'Database queries per request by view.', ('view',),
+                            buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+QUERY_DURATION = Histogram('library_db_query_duration_seconds', 'Duration of single database queries.',
+                           buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, 1))
+BORROW_OUTCOMES = Counter('library_borrow_outcomes', 'Borrow and return attempts by result.',
+                          ('operation', 'outcome'))
+CACHE_LOOKUPS = Counter('library_cache_lookups', 'Cache lookups by cache and result, for hit ratios.',
+                        ('cache', 'result'))
+
+
+def cache_lookup(name: str, hit: bool, count: int = 1) -> None:
+    if count:
+        CACHE_LOOKUPS.inc(name, 'hit' if hit else 'miss', amount=count)
@@ -0,0 +1,228 @@
+import contextvars
+import cProfile
+import logging
+import os
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+from importlib import import_module
+from types import SimpleNamespace
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.http import HttpRequest, HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from auth_api.authentication import CachedJWTAuthentication
+from library.metrics import QUERY_DURATION, REQUESTS, REQUEST_DURATION, REQUEST_QUERIES
+from library.slowqueries import slow_queries
+
+logger = logging.getLogger('library.requests')
+
+PROFILE_HEADER = 'X-Profile'
+
+
+@dataclass
+class RequestTimings:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db: float = 0.0
+    view_name: Optional[str] = None
+    view_module: Optional[str] = None
+    view_started: Optional[float] = None
+    view: Optional[float] = None
+    render: Optional[float] = None
+    peak_alloc: Optional[int] = None
+
+
+# Set for the duration of a request. Context variables follow the request into sync_to_async threads,
+# so queries of async views are counted too.
+current_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar('current_timings',
+                                                                                           default=None)
+
+
+def time_queries(execute, sql, params, many, context):
+    timings = current_timings.get()
+    threshold = settings.LIBRARY_SLOW_QUERY_THRESHOLD
+    if timings is None and threshold is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        result = execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if timings is not None:
+            timings.queries += 1
+            timings.db += duration
+            QUERY_DURATION.observe(duration)
+    if threshold is not None and duration >= threshold:
+        slow_queries.record(duration, sql, params, many, context['connection'],
+                            timings.view_name if timings else None, timings.view_module if timings else None)
+    return result
+
+
+def install_query_timer(sender, connection, **kwargs) -> None:
+    """connection_created receiver: every connection reports its queries to the current request and the slow query log."""
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+class ServerTimingMiddleware:
+    """
+    Reports where a request spent its time in a Server-Timing header and a log record of
+    library.requests: query count and database time, time in the view (including building the
+    payload), time rendering the response, total time and, when LIBRARY_TRACE_ALLOCATIONS is on,
+    peak traced allocation. Latency, status and query counts also go to the /metrics histograms.
+
+    A staff user can send "X-Profile: 1" to get the request profiled with cProfile; the stats are
+    written to LIBRARY_PROFILE_DIR and the file name returned in the X-Profile-Dump header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        if settings.LIBRARY_TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = request.headers.get(PROFILE_HEADER) == '1' and _is_staff(request)
+        timings, token, profiler = self._start(profile)
+        try:
+            if profiler:
+                response = profiler.runcall(self.get_response, request)
+            else:
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self._finish(request, response, timings, profiler)
+
+    async def __acall__(self, request: HttpRequest):
+        profile = request.headers.get(PROFILE_HEADER) == '1' and await sync_to_async(_is_staff)(request)
+        timings, token, profiler = self._start(profile)
+        try:
+            if profiler:
+                profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+        finally:
+            current_timings.reset(token)
+        return self._finish(request, response, timings, profiler)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current_timings.get()
+        if timings is not None:
+            timings.view_name = request.resolver_match.url_name
+            timings.view_module = view_func.__module__
+            timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so the view ends here and rendering starts
+        timings = current_timings.get()
+        if timings is not None and timings.view_started is not None:
+            view_ended = time.perf_counter()
+            timings.view = view_ended - timings.view_started
+
+            def rendered(response):
+                timings.render = time.perf_counter() - view_ended
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def _start(self, profile: bool) -> tuple[RequestTimings, contextvars.Token, Optional[cProfile.Profile]]:
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            timings.peak_alloc = tracemalloc.get_traced_memory()[0]
+        return timings, token, cProfile.Profile() if profile else None
+
+    def _finish(self, request: HttpRequest, response: HttpResponse, timings: RequestTimings,
+                profiler: Optional[cProfile.Profile]) -> HttpResponse:
+        total = time.perf_counter() - timings.started
+        if timings.view is None and timings.view_started is not None:
+            timings.view = time.perf_counter() - timings.view_started
+        if timings.peak_alloc is not None:
+            # Tracing is process wide: with concurrent requests this includes their allocations too
+            timings.peak_alloc = max(0, tracemalloc.get_traced_memory()[1] - timings.peak_alloc)
+
+        metrics = [f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries"']
+        if timings.view is not None:
+            metrics.append(f'view;dur={timings.view * 1000:.2f}')
+        if timings.render is not None:
+            metrics.append(f'render;dur={timings.render * 1000:.2f}')
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        if timings.peak_alloc is not None:
+            metrics.append(f'alloc;desc="{timings.peak_alloc} bytes peak"')
+        response['Server-Timing'] = ', '.join(metrics)
+
+        if profiler:
+            response['X-Profile-Dump'] = _dump(profiler)
+
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unmatched'
+        REQUESTS.inc(view, _method_label(request.method), _status_label(response.status_code))
+        REQUEST_DURATION.observe(total, view)
+        REQUEST_QUERIES.observe(timings.queries, view)
+        logger.info('%s %s %s %.1fms', request.method, request.path, response.status_code, total * 1000, extra={
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 2),
+            'db_queries': timings.queries,
+            'db_ms': round(timings.db * 1000, 2),
+            'view_ms': round(timings.view * 1000, 2) if timings.view is not None else None,
+            'render_ms': round(timings.render * 1000, 2) if timings.render is not None else None,
+            'peak_alloc_bytes': timings.peak_alloc,
+        })
+        return response
+
+
+# Label values come from the client, and every distinct one is a series kept until the metrics directory is
+# cleared: anything outside the standard set is counted together
+STANDARD_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'))
+
+
+def _method_label(method: str) -> str:
+    return method if method in STANDARD_METHODS else 'other'
+
+
+def _status_label(status: int) -> str:
+    return str(status) if 100 <= status <= 599 else 'other'
+
+
+def _is_staff(request: HttpRequest) -> bool:
+    """
+    The session user, or the user of the request's JWT, resolved through the cached lookup. This runs
+    before the session and authentication middleware, so the session is loaded from its cookie here.
+    """
+    session = getattr(request, 'session', None)
+    if session is None:
+        session = import_module(settings.SESSION_ENGINE).SessionStore(
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    user = get_user(SimpleNamespace(session=session))
+    if user.is_authenticated:
+        return user.is_staff
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+
+def _dump(profiler: cProfile.Profile) -> str:
+    os.makedirs(settings.LIBRARY_PROFILE_DIR, exist_ok=True)
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}.prof'
+    profiler.dump_stats(os.path.join(settings.LIBRARY_PROFILE_DIR, name))
+    return name
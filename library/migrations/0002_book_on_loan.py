@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_on_loan(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    Borrow = apps.get_model('library', 'Borrow')
+    open_borrows = (Borrow.objects
+                    .filter(book=OuterRef('pk'), returned_at__isnull=True)
+                    .order_by()
+                    .values('book')
+                    .annotate(count=Count('pk'))
+                    .values('count'))
+    Book.objects.update(on_loan=Coalesce(Subquery(open_borrows), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='on_loan',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_on_loan, migrations.RunPython.noop),
+    ]
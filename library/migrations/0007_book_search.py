@@ -0,0 +1,63 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE books_fts USING fts5(
+        isbn UNINDEXED, title, author, tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts (isbn, title, author) VALUES (new.isbn, new.title, new.author);
+    END""",
+    """CREATE TRIGGER books_fts_update AFTER UPDATE OF isbn, title, author ON books BEGIN
+        DELETE FROM books_fts WHERE isbn = old.isbn;
+        INSERT INTO books_fts (isbn, title, author) VALUES (new.isbn, new.title, new.author);
+    END""",
+    """CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN
+        DELETE FROM books_fts WHERE isbn = old.isbn;
+    END""",
+    "INSERT INTO books_fts (isbn, title, author) SELECT isbn, title, author FROM books",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER books_fts_delete",
+    "DROP TRIGGER books_fts_update",
+    "DROP TRIGGER books_fts_insert",
+    "DROP TABLE books_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    """ALTER TABLE books ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(author, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX books_search_vector ON books USING GIN (search_vector)",
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX books_search_vector",
+    "ALTER TABLE books DROP COLUMN search_vector",
+]
+
+
+def run_for_vendor(sqlite, postgresql):
+    def run(apps, schema_editor):
+        statements = {'sqlite': sqlite, 'postgresql': postgresql}.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index over book titles and authors, kept up to date by the database itself:
+    an FTS5 table maintained by triggers on SQLite, a generated tsvector column with a GIN index on PostgreSQL.
+    Other backends fall back to unindexed substring search.
+    """
+
+    dependencies = [
+        ('library', '0006_borrows_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_for_vendor(SQLITE_FORWARD, POSTGRESQL_FORWARD),
+                             run_for_vendor(SQLITE_BACKWARD, POSTGRESQL_BACKWARD)),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_book_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title', 'isbn'], name='books_by_title'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author', 'isbn'], name='books_by_author'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['available_copies', 'isbn'], name='books_by_available_copies'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_book_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('isbn', models.CharField(max_length=13)),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('restocked', 'Restocked'), ('borrowed', 'Borrowed'), ('returned', 'Returned')], max_length=16)),
+                ('title', models.CharField(max_length=255, null=True)),
+                ('author', models.CharField(max_length=255, null=True)),
+                ('available_copies_delta', models.IntegerField(default=0)),
+                ('on_loan_delta', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Catalog change',
+                'verbose_name_plural': 'Catalog changes',
+                'db_table': 'catalog_changes',
+            },
+        ),
+    ]
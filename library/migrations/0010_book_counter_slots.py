@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_catalog_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='counter_slots',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BookCounterSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('capacity', models.IntegerField()),
+                ('on_loan', models.IntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_slot_set', to='library.book')),
+            ],
+            options={
+                'verbose_name': 'Book counter slot',
+                'verbose_name_plural': 'Book counter slots',
+                'db_table': 'book_counter_slots',
+                'constraints': [models.UniqueConstraint(fields=('book', 'slot'), name='unique_book_counter_slot')],
+            },
+        ),
+    ]
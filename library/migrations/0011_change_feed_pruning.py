@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0010_book_counter_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedHorizon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pruned_through', models.BigIntegerField()),
+                ('pruned_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'catalog_changes_horizon',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='catalogchange',
+            index=models.Index(fields=['created_at'], name='catalog_changes_by_created_at'),
+        ),
+    ]
@@ -7,6 +7,16 @@ class Book(models.Model):
     author = models.CharField(max_length=255)
     isbn = models.CharField(max_length= 13, unique=True, primary_key=True)
     available_copies = models.IntegerField()
+    # Number of open borrows, kept in sync by library.services.borrows
+    on_loan = models.IntegerField(default=0)
+    # When positive, copies and open borrows are split across that many BookCounterSlot rows
+    # and on_loan stays 0, see library.services.inventory
+    counter_slots = models.PositiveSmallIntegerField(default=0)
+
+    @property
+    def available_now(self) -> int:
+        """Copies available right now. Doesn't account for counter slots."""
+        return self.available_copies - self.on_loan
 
     def __str__(self):
         return f"{self.title} by {self.author}. ISBN: {self.isbn}."
@@ -15,6 +25,12 @@ class Book(models.Model):
         db_table = 'books'
         verbose_name = 'Book'
         verbose_name_plural = "Books"
+        indexes = [
+            # Keyset pagination of the listing sorted or filtered by these columns
+            models.Index(fields=['title', 'isbn'], name='books_by_title'),
+            models.Index(fields=['author', 'isbn'], name='books_by_author'),
+            models.Index(fields=['available_copies', 'isbn'], name='books_by_available_copies'),
+        ]
 
 class Borrow(models.Model):
     user = models.ForeignKey(User, models.CASCADE)
@@ -29,3 +45,92 @@ class Borrow(models.Model):
         db_table = 'borrows'
         verbose_name = 'Borrow'
         verbose_name_plural = 'Borrows'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'book'], condition=models.Q(returned_at__isnull=True),
+                                    name='unique_open_borrow'),
+        ]
+        indexes = [
+            # Serves "my current borrows" lookups already sorted by borrowed_at
+            models.Index(fields=['user', 'borrowed_at', 'book'], condition=models.Q(returned_at__isnull=True),
+                         name='open_borrows_by_user'),
+            # Admin listing of open borrows, keyset-paginated by id
+            models.Index(fields=['id'], condition=models.Q(returned_at__isnull=True), name='open_borrows'),
+            # Counting open borrows per book when reconciling or checking availability
+            models.Index(fields=['book'], condition=models.Q(returned_at__isnull=True), name='open_borrows_by_book'),
+            # "Has the user ever borrowed this book" checks on return
+            models.Index(fields=['user', 'book'], name='borrows_by_user_book'),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Rows of a catalog file already committed by the import_books command."""
+    source = models.CharField(max_length=1024, unique=True)
+    rows_done = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source}: {self.rows_done} rows imported"
+
+    class Meta:
+        db_table = 'import_checkpoints'
+        verbose_name = 'Import checkpoint'
+        verbose_name_plural = 'Import checkpoints'
+
+
+class CatalogChange(models.Model):
+    """Append-only log of catalog mutations, read by replicas through /api/changes/."""
+    KIND_CHOICES = [
+        ('created', 'Created'),
+        ('restocked', 'Restocked'),
+        ('borrowed', 'Borrowed'),
+        ('returned', 'Returned'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    isbn = models.CharField(max_length=13)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    title = models.CharField(max_length=255, null=True)
+    author = models.CharField(max_length=255, null=True)
+    available_copies_delta = models.IntegerField(default=0)
+    on_loan_delta = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.seq} {self.kind} {self.isbn}"
+
+    class Meta:
+        db_table = 'catalog_changes'
+        verbose_name = 'Catalog change'
+        verbose_name_plural = 'Catalog changes'
+        indexes = [
+            # Pruning finds the changes past retention by age
+            models.Index(fields=['created_at'], name='catalog_changes_by_created_at'),
+        ]
+
+
+class ChangeFeedHorizon(models.Model):
+    """Single row holding the highest seq pruned from the change feed; readers behind it have to resync."""
+    pruned_through = models.BigIntegerField()
+    pruned_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'catalog_changes_horizon'
+
+
+class BookCounterSlot(models.Model):
+    """One share of a book's copies and open borrows, so that writers of a popular book don't queue on one row."""
+    book = models.ForeignKey(Book, models.CASCADE, related_name='counter_slot_set')
+    slot = models.PositiveSmallIntegerField()
+    capacity = models.IntegerField()
+    on_loan = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.book_id} slot {self.slot}: {self.on_loan}/{self.capacity}"
+
+    class Meta:
+        db_table = 'book_counter_slots'
+        verbose_name = 'Book counter slot'
+        verbose_name_plural = 'Book counter slots'
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'slot'], name='unique_book_counter_slot'),
+        ]
@@ -0,0 +1,229 @@
+import bisect
+import heapq
+import logging
+import sys
+import threading
+import time
+import unicodedata
+from typing import Iterable, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connections
+
+from library.models import Book
+
+logger = logging.getLogger(__name__)
+
+# Besides the full title or author, also match from the start of each of its next few words
+MAX_WORD_STARTS = 4
+
+# Estimated bytes of an entry besides its key: the Suggestion tuple, its position int and two list slots
+ENTRY_OVERHEAD = 120
+
+# Entries added one book at a time wait in a small side array until there are this many to merge at once
+RECENT_MAX_ENTRIES = 1000
+
+# suggest ranks at most limit * RANK_WINDOW of the matches, the first ones in key order
+RANK_WINDOW = 8
+
+
+class Suggestion(NamedTuple):
+    kind: str
+    text: str
+    isbn: Optional[str]
+    position: int
+
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of normalized keys with a parallel array of suggestions, searched with bisect.
+    A key exists for the full title and author and for each of their first few word starts.
+    Authors are indexed once however many books they wrote. Once max_entries is reached
+    only full titles and authors are added, and once the estimated size reaches max_bytes
+    nothing more is.
+
+    Small additions go to a second, recent array that suggest searches as well, so creating
+    a book costs O(recent) rather than a merge of the whole index.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes if max_bytes is not None else sys.maxsize
+        # Keys and suggestions are swapped together so readers never need the lock
+        self.arrays: tuple[list[str], list[Suggestion]] = ([], [])
+        self.recent: tuple[list[str], list[Suggestion]] = ([], [])
+        self.authors: set[str] = set()
+        self.bytes = 0
+        self.truncated = False
+        self.lock = threading.Lock()
+
+    def _entries(self, books: Iterable[tuple[str, str, str]], budget: int,
+                 byte_budget: int) -> tuple[list[tuple[str, Suggestion]], int]:
+        entries = []
+        size = 0
+        for isbn, title, author in books:
+            if size >= byte_budget:
+                self.truncated = True
+                break
+            sources = [('title', title, isbn)]
+            author_key = normalize(author)
+            if author_key and author_key not in self.authors:
+                self.authors.add(author_key)
+                size += sys.getsizeof(author_key)
+                sources.append(('author', author, None))
+            for kind, text, ref in sources:
+                size += sys.getsizeof(text)
+                words = normalize(text).split()
+                starts = len(words) if len(entries) < budget else 1
+                for position in range(min(starts, MAX_WORD_STARTS + 1)):
+                    key = ' '.join(words[position:])
+                    size += sys.getsizeof(key) + ENTRY_OVERHEAD
+                    entries.append((key, Suggestion(kind, text, ref, position)))
+        entries.sort(key=lambda entry: entry[0])
+        return entries, size
+
+    def add(self, books: Iterable[tuple[str, str, str]]) -> None:
+        """
+        Adds (isbn, title, author) rows to the recent array in O(recent + new rows), or merges
+        them and the recent ones into the index in O(index + new rows) once there are too many.
+        """
+        with self.lock:
+            new, size = self._entries(books, self.max_entries - len(self), self.max_bytes - self.bytes)
+            self.bytes += size
+            if not new:
+                return
+            recent = list(heapq.merge(zip(*self.recent), new, key=lambda entry: entry[0]))
+            if len(recent) <= RECENT_MAX_ENTRIES:
+                self.recent = ([key for key, _ in recent], [suggestion for _, suggestion in recent])
+                return
+            merged = list(heapq.merge(zip(*self.arrays), recent, key=lambda entry: entry[0]))
+            # Swapped in this order a reader may see an entry twice, which suggest drops, but never miss one
+            self.arrays = ([key for key, _ in merged], [suggestion for _, suggestion in merged])
+            self.recent = ([], [])
+
+    def __len__(self) -> int:
+        return len(self.arrays[0]) + len(self.recent[0])
+
+    def suggest(self, prefix: str, limit: int) -> list[Suggestion]:
+        """
+        Full-text matches first, then shorter texts. The ranking is approximate: only the first
+        limit * RANK_WINDOW matches in key order are ranked, so a short prefix with many matches
+        can miss a better one further along.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        window = []
+        for keys, suggestions in (self.arrays, self.recent):
+            start = bisect.bisect_left(keys, prefix)
+            end = bisect.bisect_left(keys, prefix + '\U0010ffff', lo=start)
+            window += suggestions[start:min(end, start + limit * RANK_WINDOW)]
+        seen = set()
+        result = []
+        for suggestion in sorted(window, key=lambda s: (s.position, len(s.text), s.text)):
+            identity = (suggestion.kind, suggestion.isbn or suggestion.text)
+            if identity not in seen:
+                seen.add(identity)
+                result.append(suggestion)
+                if len(result) == limit:
+                    break
+        return result
+
+
+_index: Optional[PrefixIndex] = None
+_built_at = 0.0
+# Held by whoever builds the index, including a background refresh from start to finish
+_build_lock = threading.Lock()
+# Books created while a refresh runs, added to the new index too in case its scan missed them
+_pending: Optional[list[tuple[str, str, str]]] = None
+_pending_lock = threading.Lock()
+
+
+def build_index() -> PrefixIndex:
+    index = PrefixIndex(settings.LIBRARY_AUTOCOMPLETE_MAX_ENTRIES, settings.LIBRARY_AUTOCOMPLETE_MAX_BYTES)
+    index.add(Book.objects.values_list('isbn', 'title', 'author').iterator(chunk_size=2000))
+    if index.truncated:
+        logger.warning('Autocomplete index reached LIBRARY_AUTOCOMPLETE_MAX_BYTES, later books are not suggested')
+    return index
+
+
+def get_index() -> PrefixIndex:
+    """
+    Returns the process-wide index, building it on first use. Books added by other processes
+    are picked up by a full rebuild every LIBRARY_AUTOCOMPLETE_REFRESH_INTERVAL seconds on a
+    background thread, while the previous index keeps serving requests.
+    """
+    global _index, _built_at
+    if _index is None:
+        with _build_lock:
+            if _index is None:
+                _index = build_index()
+                _built_at = time.monotonic()
+    elif time.monotonic() - _built_at > settings.LIBRARY_AUTOCOMPLETE_REFRESH_INTERVAL:
+        _start_refresh()
+    return _index
+
+
+def _start_refresh() -> None:
+    global _pending
+    if not _build_lock.acquire(blocking=False):
+        return
+    with _pending_lock:
+        _pending = []
+    try:
+        threading.Thread(target=_refresh_in_background, name='autocomplete-refresh', daemon=True).start()
+    except RuntimeError:
+        _build_lock.release()
+        raise
+
+
+def _refresh_in_background() -> None:
+    global _pending
+    try:
+        refresh_index()
+    except Exception:
+        logger.exception('Rebuilding the autocomplete index failed, the previous one stays in use')
+    finally:
+        with _pending_lock:
+            _pending = None
+        # The thread's own database connections
+        connections.close_all()
+        _build_lock.release()
+
+
+def refresh_index() -> None:
+    """Builds a new index and swaps it in. The caller holds _build_lock."""
+    global _index, _built_at, _pending
+    index = build_index()
+    with _pending_lock:
+        pending, _pending = _pending or [], None
+    index.add(pending)
+    _index = index
+    _built_at = time.monotonic()
+
+
+def index_books(books: Iterable[tuple[str, str, str]]) -> None:
+    """Adds freshly created (isbn, title, author) rows to this process' index, if it was built."""
+    if _index is None:
+        return
+    books = list(books)
+    with _pending_lock:
+        if _pending is not None:
+            _pending.extend(books)
+    _index.add(books)
+
+
+def reset_index() -> None:
+    global _index, _built_at
+    with _build_lock:
+        _index = None
+        _built_at = 0.0
+
+
+def suggest(prefix: str, limit: int) -> list[Suggestion]:
+    return get_index().suggest(prefix, limit)
@@ -1,34 +1,206 @@
-﻿from dataclasses import dataclass
+﻿import re
+from dataclasses import asdict, dataclass
 from enum import Enum
-from typing import Optional
+from typing import Any, Mapping, Optional
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, QuerySet
 from django.http import HttpRequest
 from rest_framework.response import Response
 from rest_framework.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
 
-from library.models import Book, Borrow
+from library.metrics import cache_lookup
+from library.models import Book, Borrow, CatalogChange
+from library.services.autocomplete import index_books
+from library.services.catalog import bump_catalog_version, catalog_cache_key
+from library.services.changes import record_changes
+from library.services.inventory import add_slot_capacity, aslots_on_loan, effective_on_loan, slots_on_loan
+from library.services.pagination import apaginate_keyset, paginate_keyset
+from library.services.singleflight import asingle_flight, single_flight
 
 
-def list_books() -> list[str]:
-    book_queryset = Book.objects.all()
-    resp = [str(book) for book in book_queryset]
-    return resp
+BOOK_LIST_FIELDS = ('isbn', 'title', 'author', 'available_copies', 'available_now')
+BOOK_LIST_ORDERS = ('isbn', 'title', 'author', 'available_copies')
+
+
+@dataclass(frozen=True)
+class BookListQuery:
+    author: Optional[str] = None
+    available: bool = False
+    order: str = 'isbn'
+    fields: Optional[tuple[str, ...]] = None
+
+
+def list_books(cursor: Optional[str] = None, page_size: Optional[int] = None,
+               query: Optional[BookListQuery] = None) -> tuple[list[str] | list[dict], Optional[str]]:
+    """
+    Returns one page of books and the cursor of the next one. Filtering and ordering run in SQL.
+    Without query.fields books are rendered with str(), otherwise only the requested columns are
+    fetched and returned as dicts.
+    """
+    queryset, query, page_size = _books_list_queryset(query, page_size)
+    rows, next_cursor = paginate_keyset(queryset, query.order, cursor, page_size, tiebreaker='isbn')
+    return _render_books(rows, query), next_cursor
+
+
+async def alist_books(cursor: Optional[str] = None, page_size: Optional[int] = None,
+                      query: Optional[BookListQuery] = None) -> tuple[list[str] | list[dict], Optional[str]]:
+    """Async counterpart of list_books."""
+    queryset, query, page_size = _books_list_queryset(query, page_size)
+    rows, next_cursor = await apaginate_keyset(queryset, query.order, cursor, page_size, tiebreaker='isbn')
+    return _render_books(rows, query), next_cursor
+
+
+def _books_list_queryset(query: Optional[BookListQuery],
+                         page_size: Optional[int]) -> tuple[QuerySet, BookListQuery, int]:
+    if page_size is None:
+        page_size = settings.LIBRARY_PAGE_SIZE
+    if query is None:
+        query = BookListQuery()
+
+    queryset = Book.objects.all()
+    if query.author:
+        queryset = queryset.filter(author=query.author)
+    if query.available or 'available_now' in (query.fields or ()):
+        queryset = queryset.annotate(available_now=F('available_copies') - effective_on_loan())
+    if query.available:
+        queryset = queryset.filter(available_now__gt=0)
+    order_field = query.order.lstrip('-')
+
+    if query.fields is None:
+        return queryset.only('isbn', 'title', 'author', order_field), query, page_size
+    columns = dict.fromkeys((*query.fields, order_field, 'isbn'))
+    return queryset.values(*columns), query, page_size
+
+
+def _render_books(rows: list, query: BookListQuery) -> list[str] | list[dict]:
+    if query.fields is None:
+        return [str(book) for book in rows]
+    return [{field: row[field] for field in query.fields} for row in rows]
+
+
+def _books_page_key(version: int, cursor: Optional[str], page_size: int, query: BookListQuery) -> str:
+    return catalog_cache_key('books', version, {'cursor': cursor, 'page_size': page_size, **asdict(query)})
+
+
+def get_books_page(version: int, cursor: Optional[str], page_size: int,
+                   query: Optional[BookListQuery] = None) -> dict:
+    """
+    Returns the books listing payload for one page, cached under the catalog version.
+    Concurrent misses for the same page are coalesced into a single query.
+    """
+    if query is None:
+        query = BookListQuery()
+
+    def compute() -> dict:
+        books, next_cursor = list_books(cursor, page_size, query)
+        return {'books': books, 'next': next_cursor}
+
+    return single_flight(_books_page_key(version, cursor, page_size, query), compute,
+                         settings.LIBRARY_CATALOG_CACHE_TTL)
+
+
+async def aget_books_page(version: int, cursor: Optional[str], page_size: int,
+                          query: Optional[BookListQuery] = None) -> dict:
+    """Async counterpart of get_books_page. Both share the same cache entries."""
+    if query is None:
+        query = BookListQuery()
+
+    async def compute() -> dict:
+        books, next_cursor = await alist_books(cursor, page_size, query)
+        return {'books': books, 'next': next_cursor}
+
+    return await asingle_flight(_books_page_key(version, cursor, page_size, query), compute,
+                                settings.LIBRARY_CATALOG_CACHE_TTL)
+
 
 def add_or_increase_book(book_info: dict[str, str | int]):
-    query = Book.objects.filter(isbn=book_info['isbn'])
-    if not query.exists():
-        obj = Book.objects.create(**book_info)
-    else:
-        obj = query.first()
-        obj.available_copies += book_info['available_copies']
-    obj.save()
+    with transaction.atomic():
+        query = Book.objects.filter(isbn=book_info['isbn'])
+        if not query.exists():
+            Book.objects.create(**book_info)
+            row = (book_info['isbn'], book_info['title'], book_info['author'])
+            transaction.on_commit(lambda: index_books([row]))
+            change = CatalogChange(isbn=book_info['isbn'], kind='created', title=book_info['title'],
+                                   author=book_info['author'], available_copies_delta=book_info['available_copies'])
+        else:
+            obj = query.first()
+            obj.available_copies += book_info['available_copies']
+            # Leave title and author alone so the search index isn't rewritten on every restock
+            obj.save(update_fields=['available_copies'])
+            if obj.counter_slots:
+                add_slot_capacity(obj.isbn, book_info['available_copies'], obj.counter_slots)
+            change = CatalogChange(isbn=book_info['isbn'], kind='restocked',
+                                   available_copies_delta=book_info['available_copies'])
+        record_changes([change])
+        bump_catalog_version()
 
 
 def get_actual_available_copies(book: Book) -> int:
-    _count = book.available_copies
-    borrow_query = Borrow.objects.filter(book=book, returned_at__isnull=True)
-    _count -= len(borrow_query)
-    return _count
+    if book.counter_slots:
+        return book.available_copies - slots_on_loan([book.isbn]).get(book.isbn, 0)
+    return book.available_now
+
+
+AVAILABILITY_CACHE_KEY = 'library:availability:{isbn}'
+
+
+def get_availability(isbns: list[str]) -> dict[str, Optional[int]]:
+    """
+    Returns copies available right now for every isbn, None for unknown books.
+    All books are read with one IN query on the primary key. With LIBRARY_AVAILABILITY_CACHE_TTL set,
+    answers are cached per isbn for that many seconds and may be that much behind.
+    """
+    ttl = settings.LIBRARY_AVAILABILITY_CACHE_TTL
+    keys = {isbn: AVAILABILITY_CACHE_KEY.format(isbn=isbn) for isbn in isbns}
+    cached = cache.get_many(list(keys.values())) if ttl else {}
+    availability = {isbn: cached[key] for isbn, key in keys.items() if key in cached}
+    if ttl:
+        cache_lookup('availability', True, len(availability))
+        cache_lookup('availability', False, len(isbns) - len(availability))
+
+    missing = [isbn for isbn in isbns if isbn not in availability]
+    if missing:
+        books = _availability_queryset().in_bulk(missing)
+        sharded = [isbn for isbn, book in books.items() if book.counter_slots]
+        fetched = _available_now(missing, books, slots_on_loan(sharded) if sharded else {})
+        if ttl:
+            cache.set_many({keys[isbn]: value for isbn, value in fetched.items()}, ttl)
+        availability.update(fetched)
+
+    return {isbn: availability[isbn] for isbn in isbns}
+
+
+async def aget_availability(isbns: list[str]) -> dict[str, Optional[int]]:
+    """Async counterpart of get_availability."""
+    ttl = settings.LIBRARY_AVAILABILITY_CACHE_TTL
+    keys = {isbn: AVAILABILITY_CACHE_KEY.format(isbn=isbn) for isbn in isbns}
+    cached = await cache.aget_many(list(keys.values())) if ttl else {}
+    availability = {isbn: cached[key] for isbn, key in keys.items() if key in cached}
+    if ttl:
+        cache_lookup('availability', True, len(availability))
+        cache_lookup('availability', False, len(isbns) - len(availability))
+
+    missing = [isbn for isbn in isbns if isbn not in availability]
+    if missing:
+        books = await _availability_queryset().ain_bulk(missing)
+        sharded = [isbn for isbn, book in books.items() if book.counter_slots]
+        fetched = _available_now(missing, books, await aslots_on_loan(sharded) if sharded else {})
+        if ttl:
+            await cache.aset_many({keys[isbn]: value for isbn, value in fetched.items()}, ttl)
+        availability.update(fetched)
+
+    return {isbn: availability[isbn] for isbn in isbns}
+
+
+def _availability_queryset() -> QuerySet:
+    return Book.objects.only('isbn', 'available_copies', 'on_loan', 'counter_slots')
+
+
+def _available_now(isbns: list[str], books: dict[str, Book], in_slots: dict[str, int]) -> dict[str, Optional[int]]:
+    return {isbn: books[isbn].available_now - in_slots.get(isbn, 0) if isbn in books else None for isbn in isbns}
 
 
 @dataclass
@@ -39,6 +211,67 @@ class BookData:
     available_copies: int | None
 
 
+# Tries of a batch upsert that lost a race to create one of its isbns
+UPSERT_ATTEMPTS = 3
+
+
+def upsert_books(books: list[BookData], batch_size: Optional[int] = None) -> dict[str, str]:
+    """
+    Creates missing books and adds available copies to existing ones, a whole batch at a time.
+    Books sharing an isbn are merged. Returns 'created' or 'updated' for every isbn.
+
+    Existing rows are locked and fetched with one IN query, then written with one
+    bulk INSERT and one bulk UPDATE, instead of three or four queries per book.
+    """
+    if batch_size is None:
+        batch_size = settings.LIBRARY_BULK_BATCH_SIZE
+
+    merged: dict[str, BookData] = {}
+    for book in books:
+        if book.isbn in merged:
+            merged[book.isbn].available_copies += book.available_copies
+        else:
+            merged[book.isbn] = BookData(book.title, book.author, book.isbn, book.available_copies)
+
+    for attempt in range(UPSERT_ATTEMPTS):
+        try:
+            return _upsert_merged(merged, batch_size)
+        except IntegrityError:
+            # Another batch created one of the new isbns after our lookup; on retry it is an existing book
+            if attempt == UPSERT_ATTEMPTS - 1:
+                raise
+
+
+def _upsert_merged(merged: dict[str, BookData], batch_size: int) -> dict[str, str]:
+    with transaction.atomic():
+        existing = Book.objects.select_for_update().in_bulk(list(merged))
+        for isbn, obj in existing.items():
+            obj.available_copies += merged[isbn].available_copies
+        Book.objects.bulk_update(existing.values(), ['available_copies'], batch_size=batch_size)
+        for isbn, obj in existing.items():
+            if obj.counter_slots:
+                add_slot_capacity(isbn, merged[isbn].available_copies, obj.counter_slots)
+
+        created = [book for isbn, book in merged.items() if isbn not in existing]
+        Book.objects.bulk_create([
+            Book(title=book.title, author=book.author, isbn=book.isbn, available_copies=book.available_copies)
+            for book in created
+        ], batch_size=batch_size)
+        if created:
+            transaction.on_commit(lambda: index_books([(book.isbn, book.title, book.author) for book in created]))
+        record_changes([
+            CatalogChange(isbn=isbn, kind='restocked', available_copies_delta=book.available_copies)
+            if isbn in existing else
+            CatalogChange(isbn=isbn, kind='created', title=book.title, author=book.author,
+                          available_copies_delta=book.available_copies)
+            for isbn, book in merged.items()
+        ])
+        if merged:
+            bump_catalog_version()
+
+    return {isbn: 'updated' if isbn in existing else 'created' for isbn in merged}
+
+
 class BookValidatorMode(Enum):
     All = 15
     TitleAuthor = 12
@@ -57,36 +290,58 @@ class BookValidatorMode(Enum):
     NoAvailableCopies = 14
 
 
+# Largest value of the available_copies IntegerField on every supported database
+MAX_COPIES = 2 ** 31 - 1
+
+
 class BookValidator:
     ERROR_MESSAGES = {
         'missing_title': "Please provide book title",
         'missing_author': "Please provide book author",
         'missing_isbn': "Please provide book isbn",
-        'missing_copies': "Please provide available copies"
+        'invalid_isbn': "Isbn must be a string of at most 13 characters",
+        'missing_copies': "Please provide available copies",
+        'missing_isbns': "Please provide a list of book isbns",
+        'too_many_isbns': "Too many isbns in one request",
+        'invalid_order': f"Order by one of: {', '.join(BOOK_LIST_ORDERS)}, optionally prefixed with '-'",
+        'invalid_fields': f"Fields must be a comma-separated subset of: {', '.join(BOOK_LIST_FIELDS)}",
+        'invalid_available': "Available must be true or false",
     }
 
     @staticmethod
     def validate_request(request: HttpRequest, mode: BookValidatorMode = BookValidatorMode.All) -> tuple[
         Optional[BookData], Optional[str]]:
-        title = request.POST.get('title')
+        return BookValidator.validate_data(request.POST, mode)
+
+    @staticmethod
+    def validate_data(data: Mapping[str, Any], mode: BookValidatorMode = BookValidatorMode.All) -> tuple[
+        Optional[BookData], Optional[str]]:
+        # JSON payloads can carry any type, so values are checked against the columns they end up in
+        title = data.get('title')
         if not title and mode.value & BookValidatorMode.Title.value:
             return None, BookValidator.ERROR_MESSAGES['missing_title']
+        if title and not BookValidator._is_text(title):
+            return None, BookValidator.ERROR_MESSAGES['missing_title']
 
-        author = request.POST.get('author')
+        author = data.get('author')
         if not author and mode.value & BookValidatorMode.Author.value:
             return None, BookValidator.ERROR_MESSAGES['missing_author']
+        if author and not BookValidator._is_text(author):
+            return None, BookValidator.ERROR_MESSAGES['missing_author']
 
-        isbn = request.POST.get('isbn')
+        isbn = data.get('isbn')
         if not isbn and mode.value & BookValidatorMode.Isbn.value:
             return None, BookValidator.ERROR_MESSAGES['missing_isbn']
+        if isbn and (not isinstance(isbn, str) or len(isbn) > 13):
+            return None, BookValidator.ERROR_MESSAGES['invalid_isbn']
 
         if mode.value & BookValidatorMode.AvailableCopies.value:
-            try:
-                available_copies = request.POST.get('available_copies')
-                if not available_copies:
-                    return None, BookValidator.ERROR_MESSAGES['missing_copies']
+            available_copies = data.get('available_copies')
+            # Form and CSV values are strings of digits, JSON ones must be integers (not bools or floats)
+            if isinstance(available_copies, str) and re.fullmatch(r'[0-9]+', available_copies):
                 available_copies = int(available_copies)
-            except ValueError or TypeError:
+            if (not isinstance(available_copies, int) or isinstance(available_copies, bool)
+                    or not 0 <= available_copies <= MAX_COPIES):
                 return None, BookValidator.ERROR_MESSAGES['missing_copies']
         else:
             available_copies = 0
@@ -98,6 +353,46 @@ class BookValidator:
             available_copies=available_copies
         ), None
 
+    @staticmethod
+    def _is_text(value: Any) -> bool:
+        return isinstance(value, str) and len(value) <= 255
+
+    @staticmethod
+    def validate_list_query(data: Mapping[str, Any]) -> tuple[Optional[BookListQuery], Optional[str]]:
+        order = data.get('order') or 'isbn'
+        if order.lstrip('-') not in BOOK_LIST_ORDERS or order.startswith('--'):
+            return None, BookValidator.ERROR_MESSAGES['invalid_order']
+
+        fields = data.get('fields')
+        if fields:
+            fields = tuple(dict.fromkeys(field.strip() for field in fields.split(',')))
+            if not all(field in BOOK_LIST_FIELDS for field in fields):
+                return None, BookValidator.ERROR_MESSAGES['invalid_fields']
+        else:
+            fields = None
+
+        available = (data.get('available') or 'false').lower()
+        if available not in ('true', 'false'):
+            return None, BookValidator.ERROR_MESSAGES['invalid_available']
+
+        return BookListQuery(
+            author=data.get('author') or None,
+            available=available == 'true',
+            order=order,
+            fields=fields,
+        ), None
+
+    @staticmethod
+    def validate_isbn_list(data: Any) -> tuple[Optional[list[str]], Optional[str]]:
+        """Validates {"isbns": [...]} payloads and returns the isbns without duplicates, in order."""
+        isbns = data.get('isbns') if isinstance(data, Mapping) else None
+        if not isinstance(isbns, list) or not isbns or not all(isinstance(isbn, str) and isbn for isbn in isbns):
+            return None, BookValidator.ERROR_MESSAGES['missing_isbns']
+        isbns = list(dict.fromkeys(isbns))
+        if len(isbns) > settings.LIBRARY_BATCH_MAX_BOOKS:
+            return None, BookValidator.ERROR_MESSAGES['too_many_isbns']
+        return isbns, None
+
     @staticmethod
     def get_queried_book_by_request(request: HttpRequest) -> tuple[Book, None] | tuple[None, Response]:
         book_data, err = BookValidator.validate_request(request, BookValidatorMode.Isbn)
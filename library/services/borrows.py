@@ -0,0 +1,313 @@
+import datetime
+import functools
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from library.metrics import BORROW_OUTCOMES, cache_lookup
+from library.models import Book, Borrow, CatalogChange
+from library.services.catalog import bump_catalog_version
+from library.services.changes import record_changes
+from library.services.inventory import release_slots, reserve_slot, shard_counter
+from library.services.pagination import apaginate_keyset, paginate_keyset
+
+
+USER_BORROWS_CACHE_KEY = 'library:user_borrows:{user_id}'
+
+
+def invalidate_user_borrows(user_id: int) -> None:
+    """Drops the cached borrows of the user once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(USER_BORROWS_CACHE_KEY.format(user_id=user_id)))
+
+
+def list_user_borrows(user_id: int) -> list[dict]:
+    """
+    Returns the open borrows of the user, cached until the user borrows or returns a book.
+    Cache misses are served by the open_borrows_by_user partial index.
+    """
+    key = USER_BORROWS_CACHE_KEY.format(user_id=user_id)
+    borrows = cache.get(key)
+    cache_lookup('user_borrows', borrows is not None)
+    if borrows is None:
+        borrows = [_user_borrow_row(borrow) for borrow in _user_borrows_queryset(user_id)]
+        cache.set(key, borrows, settings.LIBRARY_USER_BORROWS_CACHE_TTL)
+    return borrows
+
+
+async def alist_user_borrows(user_id: int) -> list[dict]:
+    """Async counterpart of list_user_borrows. Both share the same cache entry."""
+    key = USER_BORROWS_CACHE_KEY.format(user_id=user_id)
+    borrows = await cache.aget(key)
+    cache_lookup('user_borrows', borrows is not None)
+    if borrows is None:
+        borrows = [_user_borrow_row(borrow) async for borrow in _user_borrows_queryset(user_id).aiterator()]
+        await cache.aset(key, borrows, settings.LIBRARY_USER_BORROWS_CACHE_TTL)
+    return borrows
+
+
+def _user_borrows_queryset(user_id: int) -> QuerySet:
+    return (Borrow.objects
+            .filter(user_id=user_id, returned_at__isnull=True)
+            .order_by('borrowed_at')
+            .values('book_id', 'book__title', 'book__author', 'borrowed_at'))
+
+
+def _user_borrow_row(borrow: dict) -> dict:
+    return {
+        'isbn': borrow['book_id'],
+        'title': borrow['book__title'],
+        'author': borrow['book__author'],
+        'borrowed_at': borrow['borrowed_at'],
+    }
+
+
+class BorrowOutcome(Enum):
+    Ok = 'ok'
+    NotFound = 'not_found'
+    Unavailable = 'unavailable'
+    AlreadyBorrowed = 'already_borrowed'
+    NotBorrowed = 'not_borrowed'
+    AlreadyReturned = 'already_returned'
+
+
+@dataclass
+class BorrowResult:
+    outcome: BorrowOutcome
+    book: Optional[Book] = None
+    borrow: Optional[Borrow] = None
+
+
+def counts_outcomes(operation: str) -> Callable:
+    """Counts the outcomes a lend/take back function returns, one result or a dict of them, in /metrics."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            result = fn(*args, **kwargs)
+            outcomes = result.values() if isinstance(result, dict) else [result.outcome]
+            for outcome in outcomes:
+                BORROW_OUTCOMES.inc(operation, outcome.value)
+            return result
+        return wrapper
+    return decorator
+
+
+@counts_outcomes('borrow')
+def lend_book(user: User, isbn: str) -> BorrowResult:
+    """
+    Lends one copy of the book to the user.
+
+    The copy is reserved with a conditional UPDATE that only matches while on_loan < available_copies,
+    and the borrow row is inserted in the same transaction. Concurrent requests are serialized by the
+    row lock of that UPDATE, and the unique_open_borrow constraint rejects a second open borrow,
+    so neither over-lending nor double borrows are possible.
+
+    Books with counter slots take the copy from a random slot instead, so concurrent borrows
+    of a popular book mostly lock different rows.
+    """
+    book = None
+    try:
+        with transaction.atomic():
+            reserved = (Book.objects
+                        .filter(pk=isbn, counter_slots=0, on_loan__lt=F('available_copies'))
+                        .update(on_loan=F('on_loan') + 1))
+            if not reserved:
+                book = Book.objects.filter(pk=isbn).first()
+                reserved = book is not None and book.counter_slots > 0 and reserve_slot(isbn)
+            if reserved:
+                borrow = Borrow.objects.create(user=user, book_id=isbn)
+                record_changes([CatalogChange(isbn=isbn, kind='borrowed', on_loan_delta=1)])
+                invalidate_user_borrows(user.pk)
+                # Catalog pages show how many copies are available now
+                bump_catalog_version()
+                return BorrowResult(BorrowOutcome.Ok, borrow=borrow)
+    except IntegrityError:
+        borrow = (Borrow.objects
+                  .select_related('user', 'book')
+                  .filter(user=user, book_id=isbn, returned_at__isnull=True)
+                  .first())
+        book = borrow.book if borrow else Book.objects.filter(pk=isbn).first()
+        return BorrowResult(BorrowOutcome.AlreadyBorrowed, book=book, borrow=borrow)
+
+    if book is None:
+        return BorrowResult(BorrowOutcome.NotFound)
+    return BorrowResult(BorrowOutcome.Unavailable, book=book)
+
+
+@counts_outcomes('return')
+def take_back_book(user: User, isbn: str) -> BorrowResult:
+    """
+    Closes the user's open borrow of the book and releases the copy in the same transaction.
+    The borrow is closed with a conditional UPDATE, so a copy can't be released twice.
+    """
+    with transaction.atomic():
+        closed = (Borrow.objects
+                  .filter(user=user, book_id=isbn, returned_at__isnull=True)
+                  .update(returned_at=timezone.now()))
+        if closed:
+            if not Book.objects.filter(pk=isbn, counter_slots=0).update(on_loan=F('on_loan') - closed):
+                release_slots(isbn, closed)
+            record_changes([CatalogChange(isbn=isbn, kind='returned', on_loan_delta=-closed)])
+            invalidate_user_borrows(user.pk)
+            bump_catalog_version()
+            return BorrowResult(BorrowOutcome.Ok)
+
+    if not Book.objects.filter(pk=isbn).exists():
+        return BorrowResult(BorrowOutcome.NotFound)
+    if Borrow.objects.filter(user=user, book_id=isbn).exists():
+        return BorrowResult(BorrowOutcome.AlreadyReturned)
+    return BorrowResult(BorrowOutcome.NotBorrowed)
+
+
+@counts_outcomes('borrow')
+def lend_books(user: User, isbns: list[str]) -> dict[str, BorrowOutcome]:
+    """
+    Lends one copy of each book to the user in a single transaction.
+    Books and the user's open borrows are fetched with one IN query each, and all changes are written
+    with one bulk INSERT and one UPDATE, so the query count doesn't depend on the number of books.
+    """
+    outcomes = {}
+    with transaction.atomic():
+        books = Book.objects.select_for_update().in_bulk(isbns)
+        borrowed = set(Borrow.objects
+                       .filter(user=user, book_id__in=isbns, returned_at__isnull=True)
+                       .values_list('book_id', flat=True))
+        for isbn in isbns:
+            book = books.get(isbn)
+            if book is None:
+                outcomes[isbn] = BorrowOutcome.NotFound
+            elif isbn in borrowed:
+                outcomes[isbn] = BorrowOutcome.AlreadyBorrowed
+            elif book.counter_slots:
+                outcomes[isbn] = BorrowOutcome.Ok if reserve_slot(isbn) else BorrowOutcome.Unavailable
+            elif book.available_now < 1:
+                outcomes[isbn] = BorrowOutcome.Unavailable
+            else:
+                outcomes[isbn] = BorrowOutcome.Ok
+
+        lent = [isbn for isbn, outcome in outcomes.items() if outcome == BorrowOutcome.Ok]
+        if lent:
+            Borrow.objects.bulk_create([Borrow(user=user, book_id=isbn) for isbn in lent])
+            Book.objects.filter(pk__in=lent, counter_slots=0).update(on_loan=F('on_loan') + 1)
+            record_changes([CatalogChange(isbn=isbn, kind='borrowed', on_loan_delta=1) for isbn in lent])
+            invalidate_user_borrows(user.pk)
+            bump_catalog_version()
+    return outcomes
+
+
+@counts_outcomes('return')
+def take_back_books(user: User, isbns: list[str]) -> dict[str, BorrowOutcome]:
+    """
+    Closes the user's open borrows of the books and releases the copies in a single transaction,
+    with a constant number of queries.
+    """
+    with transaction.atomic():
+        open_borrows = dict(Borrow.objects
+                            .select_for_update()
+                            .filter(user=user, book_id__in=isbns, returned_at__isnull=True)
+                            .values_list('pk', 'book_id'))
+        if open_borrows:
+            Borrow.objects.filter(pk__in=list(open_borrows)).update(returned_at=timezone.now())
+            released = (Book.objects
+                        .filter(pk__in=list(open_borrows.values()), counter_slots=0)
+                        .update(on_loan=F('on_loan') - 1))
+            if released < len(open_borrows):
+                sharded = Book.objects.filter(pk__in=list(open_borrows.values()), counter_slots__gt=0)
+                for isbn in sharded.values_list('pk', flat=True):
+                    release_slots(isbn)
+            record_changes([CatalogChange(isbn=isbn, kind='returned', on_loan_delta=-1)
+                            for isbn in open_borrows.values()])
+            invalidate_user_borrows(user.pk)
+            bump_catalog_version()
+
+    returned = set(open_borrows.values())
+    outcomes = {isbn: BorrowOutcome.Ok for isbn in isbns if isbn in returned}
+    rest = [isbn for isbn in isbns if isbn not in returned]
+    if rest:
+        existing = set(Book.objects.filter(pk__in=rest).values_list('pk', flat=True))
+        borrowed_before = set(Borrow.objects.filter(user=user, book_id__in=rest).values_list('book_id', flat=True))
+        for isbn in rest:
+            if isbn not in existing:
+                outcomes[isbn] = BorrowOutcome.NotFound
+            elif isbn in borrowed_before:
+                outcomes[isbn] = BorrowOutcome.AlreadyReturned
+            else:
+                outcomes[isbn] = BorrowOutcome.NotBorrowed
+    return {isbn: outcomes[isbn] for isbn in isbns}
+
+
+def list_open_borrows(cursor: Optional[str], page_size: int, user_id: Optional[int] = None,
+                      isbn: Optional[str] = None, borrowed_after: Optional[datetime.datetime] = None,
+                      borrowed_before: Optional[datetime.datetime] = None) -> tuple[list[dict], Optional[str]]:
+    """
+    Returns one page of open borrows ordered by id, with user and book joined in the same query.
+    """
+    queryset = _open_borrows_queryset(user_id, isbn, borrowed_after, borrowed_before)
+    borrows, next_cursor = paginate_keyset(queryset, 'id', cursor, page_size)
+    return [_open_borrow_row(borrow) for borrow in borrows], next_cursor
+
+
+async def alist_open_borrows(cursor: Optional[str], page_size: int, user_id: Optional[int] = None,
+                             isbn: Optional[str] = None, borrowed_after: Optional[datetime.datetime] = None,
+                             borrowed_before: Optional[datetime.datetime] = None) -> tuple[list[dict], Optional[str]]:
+    """Async counterpart of list_open_borrows."""
+    queryset = _open_borrows_queryset(user_id, isbn, borrowed_after, borrowed_before)
+    borrows, next_cursor = await apaginate_keyset(queryset, 'id', cursor, page_size)
+    return [_open_borrow_row(borrow) for borrow in borrows], next_cursor
+
+
+def _open_borrows_queryset(user_id: Optional[int], isbn: Optional[str], borrowed_after: Optional[datetime.datetime],
+                           borrowed_before: Optional[datetime.datetime]) -> QuerySet:
+    queryset = (Borrow.objects
+                .filter(returned_at__isnull=True)
+                .select_related('user', 'book')
+                .only('id', 'borrowed_at', 'user__id', 'user__username', 'book__isbn', 'book__title'))
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    if isbn:
+        queryset = queryset.filter(book_id=isbn)
+    if borrowed_after:
+        queryset = queryset.filter(borrowed_at__gte=borrowed_after)
+    if borrowed_before:
+        queryset = queryset.filter(borrowed_at__lt=borrowed_before)
+    return queryset
+
+
+def _open_borrow_row(borrow: Borrow) -> dict:
+    return {
+        'id': borrow.id,
+        'user_id': borrow.user.id,
+        'username': borrow.user.username,
+        'isbn': borrow.book.isbn,
+        'title': borrow.book.title,
+        'borrowed_at': borrow.borrowed_at,
+    }
+
+
+def reconcile_on_loan() -> int:
+    """
+    Rebuilds Book.on_loan for every book from open borrows with a single UPDATE.
+    Books with counter slots are re-split from their open borrows one by one.
+    Returns the number of books touched.
+    """
+    open_borrows = (Borrow.objects
+                    .filter(book=OuterRef('pk'), returned_at__isnull=True)
+                    .order_by()
+                    .values('book')
+                    .annotate(count=Count('pk'))
+                    .values('count'))
+    updated = Book.objects.filter(counter_slots=0).update(on_loan=Coalesce(Subquery(open_borrows), Value(0)))
+
+    sharded = Book.objects.filter(counter_slots__gt=0).values_list('isbn', 'counter_slots')
+    for isbn, slots in sharded.iterator():
+        on_loan = Borrow.objects.filter(book_id=isbn, returned_at__isnull=True).count()
+        shard_counter(isbn, slots, on_loan=on_loan)
+        updated += 1
+    return updated
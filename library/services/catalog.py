@@ -0,0 +1,55 @@
+import hashlib
+import json
+import time
+from typing import Any
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = 'library:catalog_version'
+
+
+def get_catalog_version() -> int:
+    """
+    Returns the current catalog version. The version lives in the Django cache, so all workers
+    must share a cache backend to see each other's bumps.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from the clock so that a version lost to eviction is never reused
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+async def aget_catalog_version() -> int:
+    """Async counterpart of get_catalog_version."""
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version() -> None:
+    """Moves the catalog to a new version once the current transaction commits."""
+    transaction.on_commit(_bump)
+
+
+def _bump() -> None:
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def params_digest(params: dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def catalog_cache_key(name: str, version: int, params: dict[str, Any]) -> str:
+    return f'library:{name}:{version}:{params_digest(params)}'
+
+
+def catalog_etag(version: int, params: dict[str, Any]) -> str:
+    return f'"{version}-{params_digest(params)[:16]}"'
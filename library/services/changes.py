@@ -0,0 +1,61 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from library.models import CatalogChange, ChangeFeedHorizon
+
+HORIZON_ID = 1
+
+
+class ChangesPruned(Exception):
+    """The changes after the reader's since were partly pruned already; it has to resync from an export."""
+
+
+def record_changes(changes: list[CatalogChange]) -> None:
+    """Appends changes to the feed. Call inside the transaction that makes them."""
+    if changes:
+        CatalogChange.objects.bulk_create(changes)
+
+
+def list_changes(since: int, page_size: int) -> tuple[list[dict], int, bool]:
+    """
+    Returns changes with seq greater than since, oldest first, the seq to pass as since next time
+    and whether more changes are already waiting.
+
+    Changes younger than LIBRARY_CHANGE_FEED_SETTLE_SECONDS are held back: concurrent transactions
+    may commit sequence numbers out of order, and a reader must not skip past one still in flight.
+    created_at is taken when the row is inserted, so the window has to outlast the longest catalog
+    write transaction. Raises ChangesPruned when since is behind the pruning horizon.
+    """
+    if ChangeFeedHorizon.objects.filter(pk=HORIZON_ID, pruned_through__gt=since).exists():
+        raise ChangesPruned(since)
+    changes = CatalogChange.objects.filter(seq__gt=since).order_by('seq')
+    settle = settings.LIBRARY_CHANGE_FEED_SETTLE_SECONDS
+    if settle:
+        changes = changes.filter(created_at__lte=timezone.now() - datetime.timedelta(seconds=settle))
+
+    rows = list(changes.values('seq', 'isbn', 'kind', 'title', 'author', 'available_copies_delta',
+                               'on_loan_delta', 'created_at')[:page_size + 1])
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    return rows, rows[-1]['seq'] if rows else since, more
+
+
+def prune_changes(older_than: datetime.timedelta) -> int:
+    """Deletes changes older than older_than and moves the horizon past them. Returns the number deleted."""
+    cutoff = timezone.now() - older_than
+    with transaction.atomic():
+        through = CatalogChange.objects.filter(created_at__lt=cutoff).aggregate(seq=Max('seq'))['seq']
+        if through is None:
+            return 0
+        # The horizon is raised before the rows go, so no reader is served a feed with a silent gap
+        horizon, created = ChangeFeedHorizon.objects.select_for_update().get_or_create(
+            pk=HORIZON_ID, defaults={'pruned_through': through})
+        if not created and horizon.pruned_through < through:
+            horizon.pruned_through = through
+            horizon.save(update_fields=['pruned_through', 'pruned_at'])
+        deleted, _ = CatalogChange.objects.filter(seq__lte=through).delete()
+    return deleted
@@ -0,0 +1,51 @@
+import csv
+import json
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+
+from library.models import Book
+
+EXPORT_FIELDS = ('isbn', 'title', 'author', 'available_copies')
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class _Echo:
+    """File-like object that hands back whatever csv.writer writes into it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_book_rows(chunk_size: Optional[int] = None) -> Iterator[dict]:
+    """
+    Yields every book as a dict, fetched in chunks through a server-side cursor
+    so the whole table is never held in memory.
+    """
+    if chunk_size is None:
+        chunk_size = settings.LIBRARY_EXPORT_CHUNK_SIZE
+    queryset = Book.objects.order_by('isbn').values(*EXPORT_FIELDS)
+    yield from queryset.iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def iter_csv(rows: Iterable[dict]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def export_books(export_format: str, chunk_size: Optional[int] = None) -> Iterator[str]:
+    rows = iter_book_rows(chunk_size)
+    if export_format == 'csv':
+        return iter_csv(rows)
+    return iter_ndjson(rows)
@@ -0,0 +1,86 @@
+import csv
+import gzip
+import json
+from itertools import islice
+from typing import IO, Iterator, Optional
+
+from django.db import transaction
+
+from library.models import ImportCheckpoint
+from library.services.books import BookData, BookValidator, upsert_books
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+def guess_format(path: str) -> Optional[str]:
+    name = path.lower().removesuffix('.gz')
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.ndjson') or name.endswith('.jsonl'):
+        return 'ndjson'
+    return None
+
+
+def open_source(path: str) -> IO[str]:
+    if path.lower().endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def iter_records(stream: IO[str], import_format: str) -> Iterator[dict | None]:
+    """
+    Yields one dict per record of the file, or None for records that could not be parsed,
+    so that record numbers stay stable between runs.
+    """
+    if import_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        yield record if isinstance(record, dict) else None
+
+
+def validate_batch(records: list[dict | None], first_number: int) -> tuple[list[BookData], list[tuple[int, str]]]:
+    books = []
+    errors = []
+    for number, record in enumerate(records, start=first_number):
+        if record is None:
+            errors.append((number, 'Malformed record'))
+            continue
+        book_data, err = BookValidator.validate_data(record)
+        if err:
+            errors.append((number, err))
+        else:
+            books.append(book_data)
+    return books, errors
+
+
+def iter_import_batches(source: str, records: Iterator[dict | None], batch_size: int,
+                        restart: bool = False) -> Iterator[tuple[int, int, list[tuple[int, str]]]]:
+    """
+    Imports records in batches of batch_size, committing each batch together with the checkpoint
+    of the source, and skips records committed by a previous run. Yields
+    (records done, records imported in the batch, errors of the batch) after every commit.
+    The checkpoint is removed once the whole source has been imported.
+    """
+    checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=source)
+    if restart:
+        checkpoint.rows_done = 0
+    records = islice(records, checkpoint.rows_done, None)
+
+    while batch := list(islice(records, batch_size)):
+        books, errors = validate_batch(batch, checkpoint.rows_done + 1)
+        with transaction.atomic():
+            upsert_books(books)
+            checkpoint.rows_done += len(batch)
+            checkpoint.save(update_fields=['rows_done', 'updated_at'])
+        yield checkpoint.rows_done, len(books), errors
+
+    checkpoint.delete()
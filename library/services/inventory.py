@@ -0,0 +1,99 @@
+import random
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from library.models import Book, BookCounterSlot
+
+
+def split(total: int, parts: int) -> list[int]:
+    return [total // parts + (1 if part < total % parts else 0) for part in range(parts)]
+
+
+def shard_counter(isbn: str, slots: int, on_loan: Optional[int] = None) -> Book:
+    """
+    Splits the book's copies and open borrows across slots counter rows, or folds them back
+    into the book row when slots is 0. on_loan overrides the current number of open borrows.
+    """
+    with transaction.atomic():
+        book = Book.objects.select_for_update().get(pk=isbn)
+        current = BookCounterSlot.objects.select_for_update().filter(book=book)
+        if on_loan is None:
+            on_loan = book.on_loan + sum(current.values_list('on_loan', flat=True))
+        current.delete()
+
+        if slots:
+            rows = []
+            remaining = on_loan
+            for slot, capacity in enumerate(split(book.available_copies, slots)):
+                taken = min(capacity, remaining)
+                remaining -= taken
+                rows.append(BookCounterSlot(book=book, slot=slot, capacity=capacity, on_loan=taken))
+            # More open borrows than copies: the first slot stays full until enough copies come back
+            rows[0].on_loan += remaining
+            BookCounterSlot.objects.bulk_create(rows)
+            book.on_loan = 0
+        else:
+            book.on_loan = on_loan
+        book.counter_slots = slots
+        book.save(update_fields=['on_loan', 'counter_slots'])
+    return book
+
+
+def _take_slot(isbn: str, has_room: Q, change: int) -> bool:
+    slots = BookCounterSlot.objects.filter(book_id=isbn)
+    candidates = list(slots.filter(has_room).values_list('slot', flat=True))
+    random.shuffle(candidates)
+    for slot in candidates:
+        if slots.filter(has_room, slot=slot).update(on_loan=F('on_loan') + change):
+            return True
+    return False
+
+
+def reserve_slot(isbn: str) -> bool:
+    """Takes one copy from a random slot that still has one. Call inside a transaction."""
+    return _take_slot(isbn, Q(on_loan__lt=F('capacity')), 1)
+
+
+def release_slots(isbn: str, count: int = 1) -> None:
+    """Gives count copies back to random slots that have them on loan. Call inside a transaction."""
+    for _ in range(count):
+        _take_slot(isbn, Q(on_loan__gt=0), -1)
+
+
+def add_slot_capacity(isbn: str, copies: int, slots: int) -> None:
+    """Spreads newly added copies over the book's slots with a single UPDATE."""
+    base, extra = divmod(copies, slots)
+    BookCounterSlot.objects.filter(book_id=isbn).update(capacity=F('capacity') + Case(
+        When(slot__lt=extra, then=Value(base + 1)), default=Value(base), output_field=IntegerField()))
+
+
+def slots_on_loan(isbns: list[str]) -> dict[str, int]:
+    """Open borrows held in counter slots, per book, with one grouped query."""
+    return dict(_slots_on_loan_queryset(isbns))
+
+
+async def aslots_on_loan(isbns: list[str]) -> dict[str, int]:
+    """Async counterpart of slots_on_loan."""
+    return {isbn: total async for isbn, total in _slots_on_loan_queryset(isbns)}
+
+
+def _slots_on_loan_queryset(isbns: list[str]):
+    return (BookCounterSlot.objects
+            .filter(book_id__in=isbns)
+            .values('book_id')
+            .annotate(total=Sum('on_loan'))
+            .values_list('book_id', 'total'))
+
+
+def effective_on_loan():
+    """SQL expression of a book's open borrows, whether its counter is sharded or not."""
+    sharded = (BookCounterSlot.objects
+               .filter(book=OuterRef('pk'))
+               .order_by()
+               .values('book')
+               .annotate(total=Sum('on_loan'))
+               .values('total'))
+    return F('on_loan') + Coalesce(Subquery(sharded), Value(0))
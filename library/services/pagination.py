@@ -0,0 +1,121 @@
+import base64
+import binascii
+import json
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidPageSize(ValueError):
+    pass
+
+
+def encode_cursor(value: Any) -> str:
+    raw = json.dumps(value, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Any:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    parts = value if isinstance(value, list) else [value]
+    if not parts or any(isinstance(part, bool) or not isinstance(part, (str, int)) for part in parts):
+        raise InvalidCursor(cursor)
+    return value
+
+
+def parse_page_size(raw: Optional[str]) -> int:
+    """
+    Returns page size requested by client, clamped to LIBRARY_MAX_PAGE_SIZE.
+    Falls back to LIBRARY_PAGE_SIZE when nothing was requested.
+    """
+    if raw is None or raw == '':
+        return settings.LIBRARY_PAGE_SIZE
+    try:
+        page_size = int(raw)
+    except (ValueError, TypeError):
+        raise InvalidPageSize(raw)
+    if page_size < 1:
+        raise InvalidPageSize(raw)
+    return min(page_size, settings.LIBRARY_MAX_PAGE_SIZE)
+
+
+def paginate_keyset(queryset: QuerySet, key: str, cursor: Optional[str], page_size: int,
+                    tiebreaker: Optional[str] = None) -> tuple[list, Optional[str]]:
+    """
+    Returns one page of queryset ordered by key and the cursor of the next page.
+    Seeks past the last seen key instead of using OFFSET, so every page costs the same.
+
+    key may start with '-' for descending order. When key isn't unique, pass a unique tiebreaker
+    field; the cursor then holds both values.
+    """
+    queryset = _seek(queryset, key, cursor, tiebreaker)
+    return _page(list(queryset[:page_size + 1]), key, page_size, tiebreaker)
+
+
+async def apaginate_keyset(queryset: QuerySet, key: str, cursor: Optional[str], page_size: int,
+                           tiebreaker: Optional[str] = None) -> tuple[list, Optional[str]]:
+    """Async counterpart of paginate_keyset for async views."""
+    queryset = _seek(queryset, key, cursor, tiebreaker)
+    return _page([row async for row in queryset[:page_size + 1].aiterator()], key, page_size, tiebreaker)
+
+
+def _is_compound(field: str, tiebreaker: Optional[str]) -> bool:
+    return tiebreaker is not None and tiebreaker != field
+
+
+def _seek(queryset: QuerySet, key: str, cursor: Optional[str], tiebreaker: Optional[str]) -> QuerySet:
+    field = key.lstrip('-')
+    descending = key.startswith('-')
+    compound = _is_compound(field, tiebreaker)
+    ordering = [key, ('-' if descending else '') + tiebreaker] if compound else [key]
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        value = decode_cursor(cursor)
+        if compound != isinstance(value, list) or (compound and len(value) != 2):
+            raise InvalidCursor(cursor)
+        past = 'lt' if descending else 'gt'
+        if compound:
+            first = _cursor_value(queryset, field, value[0], cursor)
+            second = _cursor_value(queryset, tiebreaker, value[1], cursor)
+            # The redundant bound on field alone lets the database seek the (field, tiebreaker) index
+            queryset = queryset.filter(**{f'{field}__{past}e': first}).filter(
+                Q(**{f'{field}__{past}': first}) | Q(**{field: first, f'{tiebreaker}__{past}': second}))
+        else:
+            queryset = queryset.filter(**{f'{field}__{past}': _cursor_value(queryset, field, value, cursor)})
+    return queryset
+
+
+def _cursor_value(queryset: QuerySet, field: str, value: Any, cursor: str) -> Any:
+    """value converted to the type of field; a cursor holding anything else was not issued by us."""
+    model_field = queryset.model._meta.get_field(field)
+    try:
+        value = model_field.to_python(value)
+        model_field.run_validators(value)
+    except (ValidationError, ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    return value
+
+
+def _page(rows: list, key: str, page_size: int, tiebreaker: Optional[str]) -> tuple[list, Optional[str]]:
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    field = key.lstrip('-')
+
+    def get(name: str) -> Any:
+        return last[name] if isinstance(last, dict) else getattr(last, name)
+
+    return rows, encode_cursor([get(field), get(tiebreaker)] if _is_compound(field, tiebreaker) else get(field))
@@ -0,0 +1,81 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from library.models import Book
+
+# Same triggers as migration 0007. SQLite drops them whenever a migration rebuilds the books table,
+# so they are recreated after every migrate.
+SQLITE_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts (isbn, title, author) VALUES (new.isbn, new.title, new.author);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF isbn, title, author ON books BEGIN
+        DELETE FROM books_fts WHERE isbn = old.isbn;
+        INSERT INTO books_fts (isbn, title, author) VALUES (new.isbn, new.title, new.author);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+        DELETE FROM books_fts WHERE isbn = old.isbn;
+    END""",
+]
+
+SQLITE_SEARCH = """
+    SELECT books.* FROM books_fts JOIN books ON books.isbn = books_fts.isbn
+    WHERE books_fts MATCH %s
+    ORDER BY bm25(books_fts, 0.0, 10.0, 5.0)
+    LIMIT %s
+"""
+
+POSTGRESQL_SEARCH = """
+    SELECT books.* FROM books, websearch_to_tsquery('english', %s) query
+    WHERE books.search_vector @@ query
+    ORDER BY ts_rank(books.search_vector, query) DESC, books.isbn
+    LIMIT %s
+"""
+
+
+# C0 and C1 control characters. FTS5 fails on a NUL even inside a quoted string, PostgreSQL rejects NULs in text.
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+
+
+def fts5_query(text: str) -> str:
+    """Turns free text into an FTS5 query matching every word, so user input can't inject FTS5 syntax."""
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in text.split())
+
+
+def search_books(text: str, limit: int) -> list[Book]:
+    """Returns books whose title or author match every word of text, best matches first."""
+    text = CONTROL_CHARACTERS.sub(' ', text)
+    if not text.split():
+        return []
+    if connection.vendor == 'sqlite':
+        return list(Book.objects.raw(SQLITE_SEARCH, [fts5_query(text), limit]))
+    if connection.vendor == 'postgresql':
+        return list(Book.objects.raw(POSTGRESQL_SEARCH, [text, limit]))
+
+    condition = Q()
+    for word in text.split():
+        condition &= Q(title__icontains=word) | Q(author__icontains=word)
+    return list(Book.objects.filter(condition).order_by('title')[:limit])
+
+
+def rebuild_search_index() -> None:
+    """Rebuilds the full-text index from the books table."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("DELETE FROM books_fts")
+            cursor.execute("INSERT INTO books_fts (isbn, title, author) SELECT isbn, title, author FROM books")
+            cursor.execute("INSERT INTO books_fts (books_fts) VALUES ('optimize')")
+        elif connection.vendor == 'postgresql':
+            cursor.execute("REINDEX INDEX books_search_vector")
+
+
+def ensure_search_triggers(using: str = 'default', **kwargs) -> None:
+    """post_migrate handler restoring the SQLite index triggers."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or 'books_fts' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+import uuid
+import weakref
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+from library.metrics import cache_lookup
+
+T = TypeVar('T')
+
+
+class _Flight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+_flights: dict[str, _Flight] = {}
+_flights_guard = threading.Lock()
+
+
+def _join_flight(key: str) -> _Flight:
+    with _flights_guard:
+        flight = _flights.setdefault(key, _Flight())
+        flight.users += 1
+        return flight
+
+
+def _leave_flight(key: str, flight: _Flight) -> None:
+    with _flights_guard:
+        flight.users -= 1
+        if not flight.users:
+            del _flights[key]
+
+
+def single_flight(key: str, compute: Callable[[], T], ttl: int, timeout: Optional[float] = None) -> T:
+    """
+    Returns the cached value of key, computing it with compute() on a miss.
+
+    Only one caller computes a missing value: threads of this process wait on a per-key lock,
+    other processes wait on a lock entry in the Django cache and poll for the result.
+    Waiters that don't see the value within timeout seconds compute it themselves.
+    """
+    value = cache.get(key)
+    cache_lookup(_cache_name(key), value is not None)
+    if value is not None:
+        return value
+    if timeout is None:
+        timeout = settings.LIBRARY_SINGLE_FLIGHT_TIMEOUT
+    deadline = time.monotonic() + timeout
+
+    flight = _join_flight(key)
+    try:
+        if not flight.lock.acquire(timeout=timeout):
+            return _compute_and_store(key, compute, ttl)
+        try:
+            value = cache.get(key)
+            if value is not None:
+                return value
+            return _lead_or_wait(key, compute, ttl, deadline)
+        finally:
+            flight.lock.release()
+    finally:
+        _leave_flight(key, flight)
+
+
+def _cache_name(key: str) -> str:
+    """'library:books:<version>:<digest>' is counted as 'books'."""
+    parts = key.split(':')
+    return parts[1] if len(parts) > 2 else 'other'
+
+
+def _lead_or_wait(key: str, compute: Callable[[], T], ttl: int, deadline: float) -> T:
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    timeout = max(1, round(deadline - time.monotonic()))
+    while not cache.add(lock_key, token, timeout=timeout):
+        # Another process is computing the value
+        if time.monotonic() >= deadline:
+            return _compute_and_store(key, compute, ttl)
+        time.sleep(settings.LIBRARY_SINGLE_FLIGHT_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    try:
+        return _compute_and_store(key, compute, ttl)
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def _compute_and_store(key: str, compute: Callable[[], T], ttl: int) -> T:
+    value = compute()
+    cache.set(key, value, ttl)
+    return value
+
+
+# Tasks can only be awaited from their own loop, so flights are kept per event loop
+_async_flights: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Task]]' = \
+    weakref.WeakKeyDictionary()
+
+
+async def asingle_flight(key: str, compute: Callable[[], Awaitable[T]], ttl: int,
+                         timeout: Optional[float] = None) -> T:
+    """
+    Async counterpart of single_flight. Coroutines of this event loop share one task per missing key
+    instead of a lock; other processes are coordinated through the same cache lock entry.
+    """
+    value = await cache.aget(key)
+    cache_lookup(_cache_name(key), value is not None)
+    if value is not None:
+        return value
+    if timeout is None:
+        timeout = settings.LIBRARY_SINGLE_FLIGHT_TIMEOUT
+
+    flights = _async_flights.setdefault(asyncio.get_running_loop(), {})
+    task = flights.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_alead_or_wait(key, compute, ttl, time.monotonic() + timeout))
+        flights[key] = task
+        task.add_done_callback(lambda _: flights.pop(key, None))
+    # A waiter that gets cancelled must not cancel the computation the others are waiting for
+    return await asyncio.shield(task)
+
+
+async def _alead_or_wait(key: str, compute: Callable[[], Awaitable[T]], ttl: int, deadline: float) -> T:
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    timeout = max(1, round(deadline - time.monotonic()))
+    while not await cache.aadd(lock_key, token, timeout=timeout):
+        if time.monotonic() >= deadline:
+            return await _acompute_and_store(key, compute, ttl)
+        await asyncio.sleep(settings.LIBRARY_SINGLE_FLIGHT_POLL_INTERVAL)
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+
+    try:
+        return await _acompute_and_store(key, compute, ttl)
+    finally:
+        if await cache.aget(lock_key) == token:
+            await cache.adelete(lock_key)
+
+
+async def _acompute_and_store(key: str, compute: Callable[[], Awaitable[T]], ttl: int) -> T:
+    value = await compute()
+    await cache.aset(key, value, ttl)
+    return value
@@ -0,0 +1,226 @@
+"""
+Slow query log.
+
+Queries that take longer than LIBRARY_SLOW_QUERY_THRESHOLD seconds and were issued from one of
+LIBRARY_SLOW_QUERY_MODULES (found on the stack, or being the module of the request's view) are grouped by
+the fingerprint of their normalized SQL. The first occurrence of a fingerprint is logged to library.slow_queries
+with the query plan; repeats are only counted and summarised at most once per LIBRARY_SLOW_QUERY_LOG_INTERVAL.
+Each process keeps its aggregates in its own JSON file in LIBRARY_SLOW_QUERY_DIR, which the slow_queries
+management command merges.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger('library.slow_queries')
+
+_string = re.compile(r"'(?:[^']|'')*'")
+_number = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_value_list = re.compile(r'\(\?(?:, \?)*\)')
+_repeated_rows = re.compile(r'(\((?:\?, )*\?\))(?:, \1)+')
+_explainable = ('SELECT', 'WITH')
+EXPLAIN_SAVEPOINT = 'library_explain'
+
+
+def normalize(sql: str) -> str:
+    """SQL with literals and placeholders replaced by ?, so IN lists and batches of any length look the same."""
+    sql = ' '.join(sql.split())
+    sql = _string.sub('?', sql)
+    sql = _number.sub('?', sql.replace('%s', '?'))
+    sql = _repeated_rows.sub(r'\1, ...', sql)
+    return _value_list.sub('(?, ...)', sql)
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+@dataclass
+class SlowQuery:
+    fingerprint: str
+    sql: str
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    views: list[str] = field(default_factory=list)
+    callers: list[str] = field(default_factory=list)
+    plan: Optional[str] = None
+    last_seen: float = 0.0
+    # Occurrences since the fingerprint was last logged
+    unlogged: int = 0
+    last_logged: float = 0.0
+
+
+class SlowQueryLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queries: dict[str, SlowQuery] = {}
+
+    def record(self, duration: float, sql: str, params, many: bool, connection,
+               view: Optional[str], view_module: Optional[str]) -> None:
+        modules = settings.LIBRARY_SLOW_QUERY_MODULES
+        caller = _caller(modules)
+        if caller is None and view_module not in modules:
+            return
+
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        now = time.time()
+        with self._lock:
+            query = self._queries.get(key)
+            if query is None:
+                query = self._add(SlowQuery(key, normalized))
+            query.count += 1
+            query.total += duration
+            query.max = max(query.max, duration)
+            query.last_seen = now
+            for values, value in ((query.views, view), (query.callers, caller)):
+                if value and value not in values and len(values) < 10:
+                    values.append(value)
+            repeats = query.unlogged
+            if query.last_logged and now - query.last_logged < settings.LIBRARY_SLOW_QUERY_LOG_INTERVAL:
+                query.unlogged += 1
+                return
+            query.last_logged = now
+            query.unlogged = 0
+
+        # Plans can change as tables grow, so they are taken again whenever the fingerprint is logged
+        if not many and normalized.upper().startswith(_explainable):
+            query.plan = explain(connection, sql, params)
+        if repeats:
+            logger.warning('Slow query %s repeated %d times, %d in total, max %.1fms (%s): %s\n%s',
+                           key, repeats, query.count, query.max * 1000, view or caller, normalized, query.plan,
+                           extra=self._extra(query, duration, params, view, caller))
+        else:
+            logger.warning('Slow query %s took %.1fms (%s): %s\n%s',
+                           key, duration * 1000, view or caller, normalized, query.plan,
+                           extra=self._extra(query, duration, params, view, caller))
+        self.save()
+
+    def _add(self, query: SlowQuery) -> SlowQuery:
+        if len(self._queries) >= settings.LIBRARY_SLOW_QUERY_MAX_FINGERPRINTS:
+            # Keep the fingerprints that cost the most
+            del self._queries[min(self._queries.values(), key=lambda entry: entry.total).fingerprint]
+        self._queries[query.fingerprint] = query
+        return query
+
+    @staticmethod
+    def _extra(query: SlowQuery, duration: float, params, view: Optional[str], caller: Optional[str]) -> dict:
+        return {
+            'fingerprint': query.fingerprint,
+            # Parameter values are not logged, they may be personal data; equal fingerprints mean equal values
+            'params_fingerprint': fingerprint(repr(params)),
+            'sql': query.sql,
+            'duration_ms': round(duration * 1000, 2),
+            'view': view,
+            'caller': caller,
+            'count': query.count,
+            'plan': query.plan,
+        }
+
+    def queries(self) -> list[SlowQuery]:
+        with self._lock:
+            return [SlowQuery(**asdict(query)) for query in self._queries.values()]
+
+    def save(self) -> None:
+        """Writes this process's aggregates for the slow_queries command, replacing the previous file."""
+        directory = settings.LIBRARY_SLOW_QUERY_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump([asdict(query) for query in self.queries()], file)
+        os.replace(f'{path}.tmp', path)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._queries.clear()
+
+
+slow_queries = SlowQueryLog()
+
+
+def _caller(modules) -> Optional[str]:
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__')
+        if module in modules:
+            return f'{module}.{frame.f_code.co_name}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+
+def explain(connection, sql: str, params) -> Optional[str]:
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    # On PostgreSQL a failed statement (a statement_timeout, say) aborts the whole transaction, so inside
+    # one the EXPLAIN gets a savepoint to roll back to instead of failing the request's next query
+    savepoint = connection.in_atomic_block and connection.features.uses_savepoints
+    with connection.cursor() as cursor:
+        # The backend cursor under Django's wrapper, so the EXPLAIN itself is neither timed nor logged
+        backend = cursor.cursor
+        if savepoint:
+            backend.execute(connection.ops.savepoint_create_sql(EXPLAIN_SAVEPOINT))
+        try:
+            backend.execute(prefix + sql, params)
+            rows = backend.fetchall()
+        except connection.Database.Error as e:
+            if savepoint:
+                backend.execute(connection.ops.savepoint_rollback_sql(EXPLAIN_SAVEPOINT))
+            return f'EXPLAIN failed: {e}'
+        if savepoint:
+            backend.execute(connection.ops.savepoint_commit_sql(EXPLAIN_SAVEPOINT))
+    if connection.vendor == 'sqlite':
+        return _sqlite_plan(rows)
+    return '\n'.join(str(row[0]) for row in rows)
+
+
+def _sqlite_plan(rows) -> str:
+    """EXPLAIN QUERY PLAN rows of (id, parent, _, detail) as an indented tree."""
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return '\n'.join(lines)
+
+
+def load_all() -> list[SlowQuery]:
+    """The aggregates of every process that saved some, merged by fingerprint."""
+    merged: dict[str, SlowQuery] = {}
+    for path in glob.glob(os.path.join(settings.LIBRARY_SLOW_QUERY_DIR, '*.json')):
+        try:
+            with open(path) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for entry in entries:
+            query = SlowQuery(**entry)
+            known = merged.get(query.fingerprint)
+            if known is None:
+                merged[query.fingerprint] = query
+                continue
+            known.count += query.count
+            known.total += query.total
+            known.max = max(known.max, query.max)
+            known.views += [view for view in query.views if view not in known.views]
+            known.callers += [caller for caller in query.callers if caller not in known.callers]
+            if query.last_seen > known.last_seen:
+                known.plan, known.last_seen = query.plan or known.plan, query.last_seen
+    return list(merged.values())
+
+
+def clear_saved() -> int:
+    paths = glob.glob(os.path.join(settings.LIBRARY_SLOW_QUERY_DIR, '*.json'))
+    for path in paths:
+        os.remove(path)
+    return len(paths)
@@ -1,6 +1,7 @@
 ﻿import datetime
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
@@ -30,6 +31,8 @@ class BookAPITest(APITestCase):
         cls.user = cls.normal_user
 
     def setUp(self):
+        # Cached listings outlive the test transaction, don't let them leak between tests
+        cache.clear()
         self.sample_book = {
             'title': 'Test Book',
             'author': 'Test Author',
@@ -0,0 +1,85 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from library.models import Book, Borrow
+from library.tests.base import UserBookAPITest
+
+
+class AsyncReadViewsTestSet(UserBookAPITest):
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            Book.objects.create(title=f'Book {i}', author='Author', isbn=f'{i:013d}', available_copies=2, on_loan=i)
+
+    def _headers(self, user):
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'} if user else {}
+
+    async def _aget(self, name, params=None, user=None, headers=None):
+        return await self.async_client.get(reverse(name), params or {}, headers=self._headers(user) | (headers or {}))
+
+    async def test_books_listing_matches_sync_view(self):
+        params = {'page_size': 2, 'order': '-title', 'fields': 'isbn,available_now'}
+        expected = (await self.async_client.get(reverse('books view'), params)).json()
+
+        response = await self._aget('async books view', params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), expected)
+        next_page = await self._aget('async books view', params | {'cursor': expected['next']})
+        self.assertEqual(len(next_page.json()['books']), 2)
+
+    async def test_books_listing_etag(self):
+        response = await self._aget('async books view')
+        not_modified = await self._aget('async books view', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_books_listing_invalid_parameters(self):
+        for params in ({'page_size': 'x'}, {'order': 'on_loan'}, {'order': 'title', 'cursor': 'IjAi'}):
+            self.assertEqual((await self._aget('async books view', params)).status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_availability(self):
+        url = reverse('async books availability view')
+        response = await self.async_client.post(url, {'isbns': ['0000000000001', '9999999999999']},
+                                                content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'availability': {'0000000000001': 1, '9999999999999': None}})
+        bad = await self.async_client.post(url, 'not json', content_type='application/json')
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_list_borrows_requires_staff(self):
+        await Borrow.objects.acreate(user=self.user, book=self.book)
+
+        forbidden = await self._aget('async list borrows view', user=self.user)
+        self.assertEqual(forbidden.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = await self._aget('async list borrows view', {'isbn': self.book.isbn}, user=self.admin_user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(borrow['username'], borrow['isbn']) for borrow in response.json()['list']],
+                         [(self.user.username, self.book.isbn)])
+
+    async def test_my_borrows(self):
+        await Borrow.objects.acreate(user=self.user, book=self.book)
+
+        response = await self._aget('async my borrows view', user=self.user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([borrow['isbn'] for borrow in response.json()['list']], [self.book.isbn])
+        anonymous = await self._aget('async my borrows view')
+        self.assertEqual(anonymous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', anonymous)
+
+    async def test_invalid_token(self):
+        response = await self._aget('async my borrows view', headers={'Authorization': 'Bearer nonsense'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+
+    async def test_inactive_user_rejected(self):
+        self.user.is_active = False
+        await self.user.asave(update_fields=['is_active'])
+        response = await self._aget('async my borrows view', user=self.user)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_wrong_method(self):
+        response = await self.async_client.post(reverse('async books view'))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -0,0 +1,135 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from library.models import Book
+from library.services import autocomplete
+from library.services.autocomplete import PrefixIndex
+from library.tests.base import AdminBookAPITest
+
+
+class PrefixIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = PrefixIndex(max_entries=1000)
+        # Merged into the index, as a build's rows would be
+        with mock.patch.object(autocomplete, 'RECENT_MAX_ENTRIES', 0):
+            self.index.add([
+                ('1', 'Dune', 'Frank Herbert'),
+                ('2', 'Dune Messiah', 'Frank Herbert'),
+                ('3', 'The Dune Encyclopedia', 'Willis McNelly'),
+                ('4', 'Émile', 'Jean-Jacques Rousseau'),
+            ])
+
+    def test_prefix_of_title_and_word(self):
+        suggestions = self.index.suggest('dun', 10)
+        self.assertEqual([s.text for s in suggestions], ['Dune', 'Dune Messiah', 'The Dune Encyclopedia'])
+
+    def test_author_indexed_once(self):
+        suggestions = self.index.suggest('herb', 10)
+        self.assertEqual([(s.kind, s.text) for s in suggestions], [('author', 'Frank Herbert')])
+
+    def test_normalized_match(self):
+        self.assertEqual(self.index.suggest('EMI', 10)[0].isbn, '4')
+
+    def test_limit(self):
+        self.assertEqual(len(self.index.suggest('d', 2)), 2)
+
+    def test_incremental_add(self):
+        self.index.add([('5', 'Children of Dune', 'Frank Herbert')])
+        self.assertIn('Children of Dune', [s.text for s in self.index.suggest('chil', 10)])
+
+    def test_small_additions_kept_apart(self):
+        size = len(self.index.arrays[0])
+        self.index.add([('5', 'Children of Dune', 'Frank Herbert')])
+
+        self.assertEqual(len(self.index.arrays[0]), size)
+        self.assertEqual([s.text for s in self.index.suggest('dune', 10)][:2], ['Dune', 'Dune Messiah'])
+        self.assertIn('Children of Dune', [s.text for s in self.index.suggest('dune', 10)])
+
+    def test_recent_additions_merged_past_threshold(self):
+        with mock.patch.object(autocomplete, 'RECENT_MAX_ENTRIES', 4):
+            self.index.add([('5', 'Children of Dune', 'Frank Herbert')])
+            self.index.add([('6', 'Chapterhouse Dune', 'Frank Herbert')])
+
+        self.assertEqual(self.index.recent, ([], []))
+        self.assertEqual(self.index.arrays[0], sorted(self.index.arrays[0]))
+        self.assertEqual([s.isbn for s in self.index.suggest('ch', 10)], ['5', '6'])
+
+    def test_ranking_window(self):
+        index = PrefixIndex(max_entries=1000)
+        index.add([(str(i), f'Aardvark {i}', 'Someone') for i in range(10)] + [('az', 'Az', 'Someone')])
+        # Only the first matches in key order are ranked, so the shorter title further along is missed
+        self.assertEqual(index.suggest('a', 1)[0].text, 'Aardvark 0')
+        self.assertEqual(index.suggest('a', 2)[0].text, 'Az')
+
+    def test_bounded_bytes(self):
+        index = PrefixIndex(max_entries=1000, max_bytes=2000)
+        index.add([(str(i), f'Some long title {i}', f'Author {i}') for i in range(100)])
+        self.assertTrue(index.truncated)
+        self.assertLess(index.bytes, 3000)
+        self.assertEqual(index.suggest('some long title 99', 10), [])
+        self.assertEqual(index.suggest('some long title 0', 10)[0].isbn, '0')
+
+    def test_bounded_entries(self):
+        index = PrefixIndex(max_entries=3)
+        index.add([(str(i), f'Some long title {i}', f'Author {i}') for i in range(10)])
+        # Past the budget only full titles and authors are indexed
+        self.assertLessEqual(len(index), 3 + 2 * 10)
+        self.assertEqual(index.suggest('title 9', 10), [])
+        self.assertEqual(index.suggest('some long title 9', 10)[0].isbn, '9')
+
+
+class AutocompleteViewTestSet(AdminBookAPITest):
+    def setUp(self):
+        super().setUp()
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+
+    def test_autocomplete(self):
+        response = self.client.get(reverse('autocomplete books view'), {'q': 'test'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['suggestions'], [
+            {'kind': 'title', 'text': 'Test Book', 'isbn': self.book.isbn},
+            {'kind': 'author', 'text': 'Test Author', 'isbn': None},
+        ])
+
+    def test_autocomplete_served_from_memory(self):
+        url = reverse('autocomplete books view')
+        self.client.get(url, {'q': 't'})
+        with self.assertNumQueries(0):
+            self.client.get(url, {'q': 'te'})
+
+    def test_added_books_are_indexed(self):
+        self.client.get(reverse('autocomplete books view'), {'q': 't'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add_new_book()
+            self.client.post(reverse('batch books view'), [
+                {'title': 'Batch Book', 'author': 'Batch Author', 'isbn': '0000000000001', 'available_copies': 1},
+            ], format='json')
+
+        url = reverse('autocomplete books view')
+        with self.assertNumQueries(0):
+            new = self.client.get(url, {'q': 'new'}).data['suggestions']
+            batch = self.client.get(url, {'q': 'batch b'}).data['suggestions']
+        self.assertEqual([s['text'] for s in new], ['New Book', 'New Author'])
+        self.assertEqual(batch[0]['isbn'], '0000000000001')
+
+    @override_settings(LIBRARY_AUTOCOMPLETE_REFRESH_INTERVAL=0)
+    def test_stale_index_rebuilt_in_background(self):
+        url = reverse('autocomplete books view')
+        self.client.get(url, {'q': 't'})
+        Book.objects.create(title='Written elsewhere', author='Other process', isbn='0000000000002', available_copies=1)
+
+        with mock.patch.object(autocomplete, '_start_refresh') as start_refresh, self.assertNumQueries(0):
+            # The request keeps the old index and leaves the rebuild to a thread
+            self.assertEqual(self.client.get(url, {'q': 'writ'}).data['suggestions'], [])
+        start_refresh.assert_called_once()
+
+        autocomplete.refresh_index()
+        # The refresh interval is still 0, so the request would start a real rebuild thread
+        with mock.patch.object(autocomplete, '_start_refresh'):
+            suggestions = self.client.get(url, {'q': 'writ'}).data['suggestions']
+        self.assertEqual(suggestions[0]['isbn'], '0000000000002')
@@ -0,0 +1,133 @@
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from library.models import Book
+from library.tests.base import AdminBookAPITest, UserBookAPITest
+
+
+class BatchBooksTestSet(AdminBookAPITest):
+    def _post(self, payload):
+        return self.client.post(reverse('batch books view'), payload, format='json')
+
+    def test_batch_creates_and_updates(self):
+        payload = [
+            {'title': 'New Book', 'author': 'New Author', 'isbn': '9876543210123', 'available_copies': 3},
+            {'title': self.sample_book['title'], 'author': self.sample_book['author'],
+             'isbn': self.sample_book['isbn'], 'available_copies': 2},
+        ]
+        response = self._post(payload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'isbn': '9876543210123', 'result': 'created'},
+            {'isbn': self.sample_book['isbn'], 'result': 'updated'},
+        ])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 7)
+        self.assertEqual(Book.objects.get(isbn='9876543210123').available_copies, 3)
+
+    def test_batch_merges_duplicate_isbns(self):
+        book = {'title': 'New Book', 'author': 'New Author', 'isbn': '9876543210123', 'available_copies': 2}
+        response = self._post([book, book])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Book.objects.get(isbn='9876543210123').available_copies, 4)
+
+    def test_batch_reports_invalid_items(self):
+        payload = [
+            {'title': 'New Book', 'author': 'New Author', 'isbn': '9876543210123'},
+            'not a book',
+            {'title': 'Zero', 'author': 'Zero', 'isbn': '0000000000000', 'available_copies': 0},
+        ]
+        response = self._post(payload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'isbn': '9876543210123', 'result': 'error', 'message': 'Please provide available copies'},
+            {'isbn': None, 'result': 'error', 'message': 'Expected a JSON object'},
+            {'isbn': '0000000000000', 'result': 'created'},
+        ])
+        self.assertFalse(Book.objects.filter(isbn='9876543210123').exists())
+
+    def test_batch_query_count_is_constant(self):
+        payload = [{'title': f'Book {i}', 'author': 'Author', 'isbn': f'{i:013d}', 'available_copies': 1}
+                   for i in range(50)]
+        payload.append({'title': 'x', 'author': 'x', 'isbn': self.sample_book['isbn'], 'available_copies': 1})
+
+        # savepoint, IN lookup, bulk update, bulk insert, change feed insert, release savepoint
+        with self.assertNumQueries(6):
+            upserted = self._post(payload)
+        self.assertEqual(len(upserted.data['results']), 51)
+
+    def test_batch_rejects_non_string_isbn(self):
+        payload = [
+            {'title': 'Number', 'author': 'Author', 'isbn': 9876543210123, 'available_copies': 1},
+            {'title': 'Long', 'author': 'Author', 'isbn': '98765432101234', 'available_copies': 1},
+        ]
+        response = self._post(payload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['result'] for result in response.data['results']], ['error', 'error'])
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_batch_rejects_wrongly_typed_fields(self):
+        book = {'title': 'New Book', 'author': 'New Author', 'isbn': '9876543210123', 'available_copies': 1}
+        payload = [
+            {**book, 'title': ['New Book']},
+            {**book, 'author': 'x' * 256},
+            {**book, 'available_copies': -1},
+            {**book, 'available_copies': 1.5},
+            {**book, 'available_copies': True},
+            {**book, 'available_copies': 2 ** 31},
+        ]
+        response = self._post(payload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result.get('message') for result in response.data['results']], [
+            'Please provide book title', 'Please provide book author',
+            *['Please provide available copies'] * 4,
+        ])
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_batch_retries_concurrently_created_isbn(self):
+        Book.objects.create(title='New Book', author='New Author', isbn='9876543210123', available_copies=1)
+        in_bulk = QuerySet.in_bulk
+        lookups = []
+
+        def racing_in_bulk(queryset, *args, **kwargs):
+            # The first lookup misses the row, as if another batch created it right after
+            lookups.append(args)
+            return {} if len(lookups) == 1 else in_bulk(queryset, *args, **kwargs)
+
+        book = {'title': 'New Book', 'author': 'New Author', 'isbn': '9876543210123', 'available_copies': 2}
+        with mock.patch.object(QuerySet, 'in_bulk', autospec=True, side_effect=racing_in_bulk):
+            response = self._post([book])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [{'isbn': '9876543210123', 'result': 'updated'}])
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(Book.objects.get(isbn='9876543210123').available_copies, 3)
+
+    def test_create_book_invalid_isbn(self):
+        response = self.client.post(reverse('books view'), {**self.sample_book, 'isbn': '98765432101234'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'message': 'Isbn must be a string of at most 13 characters'})
+
+    def test_batch_expects_array(self):
+        response = self._post({'isbn': '1'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(LIBRARY_BATCH_MAX_BOOKS=1)
+    def test_batch_too_large(self):
+        response = self._post([{}, {}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserBatchBooksTest(UserBookAPITest):
+    def test_batch_wrong_permissions(self):
+        response = self.client.post(reverse('batch books view'), [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,64 @@
+from django.urls import reverse
+from rest_framework import status
+
+from library.models import Book, Borrow
+from library.tests.base import UserBookAPITest
+
+
+class BatchBorrowTestSet(UserBookAPITest):
+    def setUp(self):
+        super().setUp()
+        self.books = [Book.objects.create(title=f'Book {i}', author='Author', isbn=f'{i:013d}', available_copies=1)
+                      for i in range(5)]
+        self.isbns = [book.isbn for book in self.books]
+
+    def _borrow(self, isbns):
+        return self.client.post(reverse('batch borrow view'), {'isbns': isbns}, format='json')
+
+    def _return(self, isbns):
+        return self.client.post(reverse('batch return view'), {'isbns': isbns}, format='json')
+
+    def test_batch_borrow_outcomes(self):
+        Book.objects.filter(pk=self.isbns[1]).update(available_copies=0)
+        Borrow.objects.create(user=self.user, book=self.books[2])
+        Book.objects.filter(pk=self.isbns[2]).update(on_loan=1)
+
+        response = self._borrow([self.isbns[0], self.isbns[1], self.isbns[2], '9999999999999', self.isbns[0]])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'isbn': self.isbns[0], 'result': 'ok'},
+            {'isbn': self.isbns[1], 'result': 'unavailable'},
+            {'isbn': self.isbns[2], 'result': 'already_borrowed'},
+            {'isbn': '9999999999999', 'result': 'not_found'},
+        ])
+        self.assertEqual(Book.objects.get(pk=self.isbns[0]).on_loan, 1)
+        self.assertEqual(Borrow.objects.filter(user=self.user, returned_at__isnull=True).count(), 2)
+
+    def test_batch_return_outcomes(self):
+        self._borrow(self.isbns[:2])
+        self._return([self.isbns[1]])
+
+        response = self._return([self.isbns[0], self.isbns[1], self.isbns[2], '9999999999999'])
+
+        self.assertEqual(response.data['results'], [
+            {'isbn': self.isbns[0], 'result': 'ok'},
+            {'isbn': self.isbns[1], 'result': 'already_returned'},
+            {'isbn': self.isbns[2], 'result': 'not_borrowed'},
+            {'isbn': '9999999999999', 'result': 'not_found'},
+        ])
+        self.assertFalse(Book.objects.filter(on_loan__gt=0).exists())
+
+    def test_batch_query_count_is_constant(self):
+        # savepoint, books, open borrows, bulk insert, counter update, change feed insert, release savepoint
+        with self.assertNumQueries(7):
+            self._borrow(self.isbns)
+        # savepoint, open borrows, close borrows, counter update, change feed insert, release savepoint
+        with self.assertNumQueries(6):
+            self._return(self.isbns)
+
+    def test_batch_invalid_payload(self):
+        for payload in ({}, {'isbns': []}, {'isbns': 'x'}, {'isbns': [1]}, []):
+            response = self.client.post(reverse('batch borrow view'), payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data, {'message': 'Please provide a list of book isbns'})
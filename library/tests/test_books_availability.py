@@ -0,0 +1,49 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from library.models import Book
+from library.tests.base import UserBookAPITest
+
+
+class BooksAvailabilityTestSet(UserBookAPITest):
+    def setUp(self):
+        super().setUp()
+        self.books = [Book.objects.create(title=f'Book {i}', author='Author', isbn=f'{i:013d}',
+                                          available_copies=3, on_loan=i) for i in range(4)]
+
+    def _availability(self, isbns):
+        return self.client.post(reverse('books availability view'), {'isbns': isbns}, format='json')
+
+    def test_availability(self):
+        response = self._availability([book.isbn for book in self.books] + ['9999999999999'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['availability'], {
+            '0000000000000': 3,
+            '0000000000001': 2,
+            '0000000000002': 1,
+            '0000000000003': 0,
+            '9999999999999': None,
+        })
+
+    def test_availability_single_query(self):
+        with self.assertNumQueries(1):
+            self._availability([book.isbn for book in self.books])
+
+    def test_availability_reflects_borrows(self):
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.assertEqual(self._availability([self.book.isbn]).data['availability'], {self.book.isbn: 4})
+
+    @override_settings(LIBRARY_AVAILABILITY_CACHE_TTL=5)
+    def test_availability_cached(self):
+        isbns = [book.isbn for book in self.books[:2]]
+        self._availability(isbns)
+        with self.assertNumQueries(1):
+            response = self._availability(isbns + [self.books[2].isbn])
+        self.assertEqual(list(response.data['availability']), isbns + [self.books[2].isbn])
+        with self.assertNumQueries(0):
+            self._availability(isbns)
+
+    def test_availability_invalid_payload(self):
+        self.assertEqual(self._availability([]).status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,4 +1,7 @@
-﻿from django.urls import reverse
+﻿import base64
+
+from django.test import override_settings
+from django.urls import reverse
 from rest_framework import status
 
 from library.models import Book
@@ -28,7 +31,7 @@ class BooksViewTestSet(UserBookAPITest):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, {'books': []})
+        self.assertEqual(response.data, {'books': [], 'next': None})
 
     def test_list_books_with_data(self):
         url = reverse('books view')
@@ -37,3 +40,98 @@ class BooksViewTestSet(UserBookAPITest):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['books']), 1)
         self.assertIn(str(self.book), response.data['books'])
+
+    def test_list_books_paginated(self):
+        for i in range(4):
+            Book.objects.create(title=f'Book {i}', author='Author', isbn=f'000000000000{i}', available_copies=1)
+        url = reverse('books view')
+
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['books']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        seen = list(response.data['books'])
+        while response.data['next']:
+            response = self.client.get(url, {'page_size': 2, 'cursor': response.data['next']})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += response.data['books']
+
+        self.assertEqual(seen, [str(book) for book in Book.objects.order_by('isbn')])
+
+    @override_settings(LIBRARY_MAX_PAGE_SIZE=2)
+    def test_list_books_page_size_clamped(self):
+        for i in range(4):
+            Book.objects.create(title=f'Book {i}', author='Author', isbn=f'000000000000{i}', available_copies=1)
+        response = self.client.get(reverse('books view'), {'page_size': 100})
+        self.assertEqual(len(response.data['books']), 2)
+
+    def test_list_books_invalid_cursor(self):
+        response = self.client.get(reverse('books view'), {'cursor': '!!!'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'message': 'Invalid cursor'})
+
+    def test_list_books_cursor_of_wrong_type(self):
+        url = reverse('books view')
+        for order, value in (('available_copies', '["x","y"]'), ('title', '["Title",1234567890123456]')):
+            cursor = base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+            response = self.client.get(url, {'order': order, 'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data, {'message': 'Invalid cursor'})
+
+    def test_list_books_invalid_page_size(self):
+        response = self.client.get(reverse('books view'), {'page_size': '0'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'message': 'Invalid page size'})
+
+
+class BooksListingQueryTestSet(UserBookAPITest):
+    def setUp(self):
+        super().setUp()
+        Book.objects.create(title='Alpha', author='Zed', isbn='0000000000003', available_copies=1, on_loan=1)
+        Book.objects.create(title='Beta', author='Zed', isbn='0000000000002', available_copies=2)
+        Book.objects.create(title='Beta', author='Amy', isbn='0000000000001', available_copies=0)
+
+    def _list(self, params):
+        response = self.client.get(reverse('books view'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def _all_pages(self, params):
+        data = self._list(params)
+        books = list(data['books'])
+        while data['next']:
+            data = self._list(params | {'cursor': data['next']})
+            books += data['books']
+        return books
+
+    def test_sparse_fields(self):
+        books = self._list({'fields': 'isbn,title'})['books']
+        self.assertEqual(books[0], {'isbn': '0000000000001', 'title': 'Beta'})
+
+    def test_available_now_field(self):
+        books = self._list({'fields': 'isbn,available_now', 'order': '-isbn'})['books']
+        self.assertEqual(books[-1], {'isbn': '0000000000001', 'available_now': 0})
+
+    def test_filter_author(self):
+        books = self._list({'author': 'Zed', 'fields': 'isbn'})['books']
+        self.assertEqual(books, [{'isbn': '0000000000002'}, {'isbn': '0000000000003'}])
+
+    def test_filter_available(self):
+        books = self._list({'available': 'true', 'fields': 'isbn'})['books']
+        self.assertEqual(books, [{'isbn': '0000000000002'}, {'isbn': self.book.isbn}])
+
+    def test_order_with_pagination(self):
+        books = self._all_pages({'order': 'title', 'fields': 'isbn', 'page_size': 1})
+        self.assertEqual([book['isbn'] for book in books],
+                         ['0000000000003', '0000000000001', '0000000000002', self.book.isbn])
+
+    def test_descending_order_with_pagination(self):
+        books = self._all_pages({'order': '-title', 'page_size': 1})
+        self.assertEqual(books, [str(book) for book in Book.objects.order_by('-title', '-isbn')])
+
+    def test_invalid_parameters(self):
+        url = reverse('books view')
+        for params in ({'order': 'on_loan'}, {'fields': 'isbn,on_loan'}, {'available': 'maybe'},
+                       {'order': 'title', 'cursor': 'IjAi'}):
+            self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,4 +1,5 @@
-﻿from django.urls import reverse
+﻿from django.db import IntegrityError, transaction
+from django.urls import reverse
 
 from library.models import Borrow
 from library.tests.base import UserBookAPITest
@@ -41,3 +42,38 @@ class BorrowBookViewTestSet(UserBookAPITest):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['message'], "ok")
         self.assertEqual(Borrow.objects.filter(user=self.user, book=self.book).count(), 1)
+
+    def test_borrow_book_last_copy(self):
+        url = reverse('borrow book view')
+        self.book.available_copies = 1
+        self.book.save()
+
+        response = self.client.post(url, {'isbn': self.book.isbn})
+        self.assertEqual(response.data['message'], "ok")
+
+        self.authenticateAs(self.admin_user)
+        response = self.client.post(url, {'isbn': self.book.isbn})
+        self.assertEqual(response.data['message'], "Test Book by Test Author. ISBN: 1234567890123. isn't available.")
+        self.assertEqual(Borrow.objects.filter(book=self.book).count(), 1)
+
+    def test_borrow_book_again_after_return(self):
+        url = reverse('borrow book view')
+        self.client.post(url, {'isbn': self.book.isbn})
+        self.client.post(reverse('return book view'), {'isbn': self.book.isbn})
+
+        response = self.client.post(url, {'isbn': self.book.isbn})
+        self.assertEqual(response.data['message'], "ok")
+        self.assertEqual(Borrow.objects.filter(user=self.user, book=self.book, returned_at__isnull=True).count(), 1)
+
+    def test_borrow_book_already_borrowed_keeps_counter(self):
+        url = reverse('borrow book view')
+        self.client.post(url, {'isbn': self.book.isbn})
+        self.client.post(url, {'isbn': self.book.isbn})
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.on_loan, 1)
+
+    def test_open_borrow_unique_constraint(self):
+        Borrow.objects.create(user=self.user, book=self.book)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Borrow.objects.create(user=self.user, book=self.book)
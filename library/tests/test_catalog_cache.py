@@ -0,0 +1,62 @@
+from django.urls import reverse
+from rest_framework import status
+
+from library.services.borrows import invalidate_user_borrows
+from library.tests.base import AdminBookAPITest
+
+
+class CatalogCacheTestSet(AdminBookAPITest):
+    def test_etag_returned(self):
+        response = self.client.get(reverse('books view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_if_none_match_not_modified_without_queries(self):
+        url = reverse('books view')
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_cached_page_served_without_queries(self):
+        url = reverse('books view')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.data, second.data)
+
+    def test_etag_differs_per_page(self):
+        url = reverse('books view')
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url, {'page_size': 1})['ETag'])
+
+    def test_book_addition_changes_version(self):
+        url = reverse('books view')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add_new_book()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['books']), 2)
+
+    def test_borrow_changes_version(self):
+        url = reverse('books view')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_user_borrows_invalidation_keeps_version(self):
+        url = reverse('books view')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_borrows(self.user.pk)
+
+        self.assertEqual(self.client.get(url)['ETag'], etag)
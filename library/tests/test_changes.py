@@ -0,0 +1,102 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+
+from library.checks import check_change_feed_settle_window
+from library.models import CatalogChange
+from library.tests.base import AdminBookAPITest
+
+
+class ChangeFeedTestSet(AdminBookAPITest):
+    def _changes(self, since=0, **params):
+        response = self.client.get(reverse('list changes view'), {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def _summary(self, changes):
+        return [(c['isbn'], c['kind'], c['available_copies_delta'], c['on_loan_delta']) for c in changes]
+
+    def test_mutations_are_recorded(self):
+        self._add_new_book()
+        self.client.post(reverse('books view'), self.sample_book)
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.client.post(reverse('return book view'), {'isbn': self.book.isbn})
+        self.client.post(reverse('batch borrow view'), {'isbns': [self.book.isbn]}, format='json')
+        self.client.post(reverse('batch return view'), {'isbns': [self.book.isbn]}, format='json')
+
+        data = self._changes()
+        self.assertEqual(self._summary(data['changes']), [
+            ('9876543210123', 'created', 3, 0),
+            (self.book.isbn, 'restocked', 5, 0),
+            (self.book.isbn, 'borrowed', 0, 1),
+            (self.book.isbn, 'returned', 0, -1),
+            (self.book.isbn, 'borrowed', 0, 1),
+            (self.book.isbn, 'returned', 0, -1),
+        ])
+        self.assertEqual(data['changes'][0]['title'], 'New Book')
+        self.assertEqual(data['next'], data['changes'][-1]['seq'])
+        self.assertFalse(data['more'])
+
+    def test_failed_operations_are_not_recorded(self):
+        self.client.post(reverse('return book view'), {'isbn': self.book.isbn})
+        self.assertFalse(CatalogChange.objects.exists())
+
+    def test_delta_pages(self):
+        self.client.post(reverse('batch books view'), [
+            {'title': 'T', 'author': 'A', 'isbn': f'{i:013d}', 'available_copies': 1} for i in range(5)
+        ], format='json')
+
+        data = self._changes(page_size=2)
+        seen = [c['isbn'] for c in data['changes']]
+        while data['more']:
+            data = self._changes(data['next'], page_size=2)
+            seen += [c['isbn'] for c in data['changes']]
+
+        self.assertEqual(seen, [f'{i:013d}' for i in range(5)])
+        self.assertEqual(self._changes(data['next']), {'changes': [], 'next': data['next'], 'more': False})
+
+    @override_settings(LIBRARY_CHANGE_FEED_SETTLE_SECONDS=60)
+    def test_fresh_changes_held_back(self):
+        self._add_new_book()
+        self.assertEqual(self._changes()['changes'], [])
+
+    def test_invalid_since(self):
+        response = self.client.get(reverse('list changes view'), {'since': '-1'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('list changes view'), {'since': '²'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prune_moves_horizon(self):
+        self._add_new_book()
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        old, recent = CatalogChange.objects.order_by('seq')
+        CatalogChange.objects.filter(pk=old.pk).update(created_at=timezone.now() - datetime.timedelta(days=40))
+
+        out = StringIO()
+        call_command('prune_catalog_changes', stdout=out)
+        self.assertIn('Pruned 1 catalog changes', out.getvalue())
+
+        self.assertEqual([c['seq'] for c in self._changes(old.seq)['changes']], [recent.seq])
+        response = self.client.get(reverse('list changes view'), {'since': 0})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_prune_without_old_changes(self):
+        self._add_new_book()
+        call_command('prune_catalog_changes', stdout=StringIO())
+        self.assertEqual(len(self._changes()['changes']), 1)
+
+    @override_settings(LIBRARY_CHANGE_FEED_SETTLE_SECONDS=0)
+    def test_settle_window_required_off_sqlite(self):
+        self.assertEqual(check_change_feed_settle_window(None), [])
+        with mock.patch.object(connections['default'], 'vendor', 'postgresql'):
+            errors = check_change_feed_settle_window(None)
+            with override_settings(LIBRARY_CHANGE_FEED_SETTLE_SECONDS=5):
+                self.assertEqual(check_change_feed_settle_window(None), [])
+        self.assertEqual([error.id for error in errors], ['library.E001'])
@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from library.models import Book
+from library.tests.base import UserBookAPITest
+
+
+class ExportBooksTestSet(UserBookAPITest):
+    def setUp(self):
+        super().setUp()
+        Book.objects.create(title='Other, Book', author='Other Author', isbn='0000000000001', available_copies=2)
+
+    def _streamed(self, response) -> str:
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        response = self.client.get(reverse('export books view'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self._streamed(response).splitlines()]
+        self.assertEqual([row['isbn'] for row in rows], ['0000000000001', self.book.isbn])
+        self.assertEqual(rows[1], self.sample_book | {'isbn': self.book.isbn})
+
+    def test_export_csv(self):
+        response = self.client.get(reverse('export books view'), {'output': 'csv'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.reader(io.StringIO(self._streamed(response))))
+        self.assertEqual(rows[0], ['isbn', 'title', 'author', 'available_copies'])
+        self.assertEqual(rows[1], ['0000000000001', 'Other, Book', 'Other Author', '2'])
+        self.assertEqual(len(rows), 3)
+
+    def test_export_unknown_format(self):
+        response = self.client.get(reverse('export books view'), {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        out = io.StringIO()
+        call_command('export_books', '--chunk-size', '1', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
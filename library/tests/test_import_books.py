@@ -0,0 +1,87 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from library.models import Book, ImportCheckpoint
+from library.services import imports
+
+
+class ImportBooksCommandTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def _import(self, *args) -> tuple[str, str]:
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_books', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        path = self._path('books.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('isbn,title,author,available_copies\n'
+                    '0000000000001,"One, the book",Author,2\n'
+                    '0000000000002,Two,Author,\n'
+                    '0000000000001,"One, the book",Author,3\n')
+
+        out, err = self._import(path, '--batch-size', '2')
+
+        self.assertEqual(Book.objects.get(isbn='0000000000001').available_copies, 5)
+        self.assertFalse(Book.objects.filter(isbn='0000000000002').exists())
+        self.assertIn('record 2: Please provide available copies', err)
+        self.assertIn('Imported 2 books, 1 records rejected', out)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_gzipped_ndjson(self):
+        path = self._path('books.ndjson.gz')
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            for i in range(5):
+                f.write(json.dumps({'isbn': f'{i:013d}', 'title': 'T', 'author': 'A', 'available_copies': i}) + '\n')
+            f.write('{broken\n')
+
+        out, err = self._import(path)
+
+        self.assertEqual(Book.objects.count(), 5)
+        self.assertIn('record 6: Malformed record', err)
+
+    def test_import_resumes_after_crash(self):
+        path = self._path('books.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(6):
+                f.write(json.dumps({'isbn': f'{i:013d}', 'title': 'T', 'author': 'A', 'available_copies': 1}) + '\n')
+
+        upsert_books = imports.upsert_books
+        calls = []
+
+        def crash_on_second_batch(books):
+            calls.append(books)
+            if len(calls) == 2:
+                raise RuntimeError('crash')
+            return upsert_books(books)
+
+        with mock.patch('library.services.imports.upsert_books', crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                self._import(path, '--batch-size', '2')
+        self.assertEqual(ImportCheckpoint.objects.get().rows_done, 2)
+
+        out, _ = self._import(path, '--batch-size', '2')
+
+        self.assertIn('Resuming after record 2', out)
+        self.assertEqual(list(Book.objects.values_list('available_copies', flat=True)), [1] * 6)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_unknown_format(self):
+        path = self._path('books.txt')
+        open(path, 'w').close()
+        with self.assertRaises(CommandError):
+            self._import(path)
@@ -1,4 +1,8 @@
-﻿from django.urls import reverse
+﻿import base64
+from datetime import datetime
+
+from django.urls import reverse
+from django.utils import timezone
 
 from library.models import Book, Borrow
 from library.tests.base import BookAPITest
@@ -27,7 +31,7 @@ class ListBorrowsUserBookAPITest(BookAPITest):
         self.returned_borrow = Borrow.objects.create(
             user=self.user,
             book=self.book,
-            returned_at='2025-06-20 12:00:00'
+            returned_at=timezone.make_aware(datetime(2025, 6, 20, 12))
         )
 
     def test_list_borrows_unauthorized(self):
@@ -54,7 +58,64 @@ class ListBorrowsUserBookAPITest(BookAPITest):
         self.assertEqual(len(response.json()['list']), 1)
 
         # Verify the response contains the active borrow
-        self.assertIn(str(self.active_borrow), response.json()['list'])
+        self.assertEqual(response.data['list'], [{
+            'id': self.active_borrow.id,
+            'user_id': self.admin_user.id,
+            'username': self.admin_user.username,
+            'isbn': self.book.isbn,
+            'title': self.book.title,
+            'borrowed_at': self.active_borrow.borrowed_at,
+        }])
+        self.assertIsNone(response.data['next'])
+
+    def test_list_borrows_query_count_is_constant(self):
+        for i in range(10):
+            book = Book.objects.create(title=f'Book {i}', author='Author', isbn=f'{i:013d}', available_copies=1)
+            Borrow.objects.create(user=self.normal_user, book=book)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('list borrows view'))
+        self.assertEqual(len(response.data['list']), 11)
+
+    def test_list_borrows_paginated(self):
+        for i in range(4):
+            book = Book.objects.create(title=f'Book {i}', author='Author', isbn=f'{i:013d}', available_copies=1)
+            Borrow.objects.create(user=self.normal_user, book=book)
+
+        url = reverse('list borrows view')
+        response = self.client.get(url, {'page_size': 2})
+        ids = [borrow['id'] for borrow in response.data['list']]
+        while response.data['next']:
+            response = self.client.get(url, {'page_size': 2, 'cursor': response.data['next']})
+            ids += [borrow['id'] for borrow in response.data['list']]
+
+        self.assertEqual(ids, list(Borrow.objects.filter(returned_at__isnull=True).order_by('id')
+                                   .values_list('id', flat=True)))
+
+    def test_list_borrows_filters(self):
+        other = Book.objects.create(title='Other', author='Author', isbn='0000000000001', available_copies=1)
+        other_borrow = Borrow.objects.create(user=self.normal_user, book=other)
+        Borrow.objects.filter(pk=other_borrow.pk).update(borrowed_at='2020-01-01T00:00:00Z')
+        url = reverse('list borrows view')
+
+        def listed(params):
+            return [borrow['id'] for borrow in self.client.get(url, params).data['list']]
+
+        self.assertEqual(listed({'user': self.normal_user.id}), [other_borrow.id])
+        self.assertEqual(listed({'isbn': self.book.isbn}), [self.active_borrow.id])
+        self.assertEqual(listed({'borrowed_before': '2021-01-01T00:00:00'}), [other_borrow.id])
+        self.assertEqual(listed({'borrowed_after': '2021-01-01T00:00:00Z'}), [self.active_borrow.id])
+
+    def test_list_borrows_invalid_filters(self):
+        url = reverse('list borrows view')
+        self.assertEqual(self.client.get(url, {'user': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'user': '²'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'borrowed_after': 'yesterday'}).status_code, 400)
 
-        # Verify the returned borrow is not included
-        self.assertNotIn(str(self.returned_borrow), response.json()['list'])
+    def test_list_borrows_cursor_of_wrong_type(self):
+        url = reverse('list borrows view')
+        for value in ('"abc"', str(2 ** 70)):
+            cursor = base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {'message': 'Invalid cursor'})
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.urls import reverse
+
+from library.metrics import Histogram, MetricsFile, registry, render, store
+from library.tests.base import UserBookAPITest
+
+
+class MetricsTestSet(UserBookAPITest):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(LIBRARY_METRICS_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        store.reset()
+        self.addCleanup(store.reset)
+        self.directory = directory
+        super().setUp()
+
+    def _scrape(self) -> dict[str, float]:
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if not line.startswith('#'):
+                sample, value = line.rsplit(' ', 1)
+                samples[sample] = float(value)
+        return samples
+
+    def test_request_counted(self):
+        self.client.get(reverse('books view'))
+        self.client.get(reverse('books view'))
+
+        samples = self._scrape()
+        self.assertEqual(samples['library_http_requests_total{view="books view",method="GET",status="200"}'], 2)
+        self.assertEqual(samples['library_http_request_duration_seconds_count{view="books view"}'], 2)
+        # The second listing is served from the page cache
+        self.assertEqual(samples['library_http_request_db_queries_sum{view="books view"}'], 1)
+        self.assertEqual(samples['library_http_request_db_queries_bucket{view="books view",le="0"}'], 1)
+        self.assertGreater(samples['library_db_query_duration_seconds_count'], 0)
+
+    def test_unknown_methods_share_a_label(self):
+        for i in range(5):
+            self.client.generic(f'MADEUP{i}', '/no/such/path/')
+
+        samples = self._scrape()
+        self.assertEqual(samples['library_http_requests_total{view="unmatched",method="other",status="404"}'], 5)
+        self.assertFalse(any('MADEUP' in sample for sample in samples))
+
+    def test_borrow_outcomes_counted(self):
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.client.post(reverse('borrow book view'), {'isbn': '0000000000000'})
+
+        samples = self._scrape()
+        self.assertEqual(samples['library_borrow_outcomes_total{operation="borrow",outcome="ok"}'], 1)
+        self.assertEqual(samples['library_borrow_outcomes_total{operation="borrow",outcome="already_borrowed"}'], 1)
+        self.assertEqual(samples['library_borrow_outcomes_total{operation="borrow",outcome="not_found"}'], 1)
+
+    def test_cache_hits_and_misses(self):
+        self.client.get(reverse('my borrows view'))
+        self.client.get(reverse('my borrows view'))
+
+        samples = self._scrape()
+        self.assertEqual(samples['library_cache_lookups_total{cache="user_borrows",result="miss"}'], 1)
+        self.assertEqual(samples['library_cache_lookups_total{cache="user_borrows",result="hit"}'], 1)
+
+    def test_processes_summed(self):
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        other = MetricsFile(os.path.join(self.directory, 'other-worker.db'))
+        other.add('["library_borrow_outcomes", "_total", [["operation", "borrow"], ["outcome", "ok"]]]', 2)
+        other.close()
+
+        samples = self._scrape()
+        self.assertEqual(samples['library_borrow_outcomes_total{operation="borrow",outcome="ok"}'], 3)
+
+    def test_histogram_buckets_cumulative(self):
+        histogram = Histogram('test_latency_seconds', 'Test histogram.', buckets=(0.1, 1))
+        self.addCleanup(registry.remove, histogram)
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value)
+
+        text = render()
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 3\n', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 4\n', text)
+        self.assertIn('test_latency_seconds_count 4\n', text)
+        self.assertIn('test_latency_seconds_sum 6.05\n', text)
+
+    def test_file_grows(self):
+        metrics_file = MetricsFile(os.path.join(self.directory, 'grow.db'))
+        for i in range(5000):
+            metrics_file.add(f'key-{i:04d}-' + 'x' * 20, i)
+        metrics_file.close()
+
+        reopened = MetricsFile(os.path.join(self.directory, 'grow.db'))
+        entries = {key: value for key, _, value in reopened._entries()}
+        reopened.close()
+        self.assertEqual(len(entries), 5000)
+        self.assertEqual(entries['key-4999-' + 'x' * 20], 4999)
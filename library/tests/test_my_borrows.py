@@ -0,0 +1,41 @@
+from django.urls import reverse
+from rest_framework import status
+
+from library.tests.base import UserBookAPITest
+
+
+class MyBorrowsTestSet(UserBookAPITest):
+    def test_my_borrows_empty(self):
+        response = self.client.get(reverse('my borrows view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'list': []})
+
+    def test_my_borrows_unauthenticated(self):
+        self.unauthenticate()
+        response = self.client.get(reverse('my borrows view'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_my_borrows_only_own_open_borrows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.authenticateAs(self.admin_user)
+        self.assertEqual(self.client.get(reverse('my borrows view')).data, {'list': []})
+
+        self.authenticate()
+        borrows = self.client.get(reverse('my borrows view')).data['list']
+        self.assertEqual([(borrow['isbn'], borrow['title'], borrow['author']) for borrow in borrows],
+                         [(self.book.isbn, self.book.title, self.book.author)])
+
+    def test_my_borrows_cached_and_invalidated(self):
+        url = reverse('my borrows view')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.assertEqual(len(self.client.get(url).data['list']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('return book view'), {'isbn': self.book.isbn})
+        self.assertEqual(self.client.get(url).data['list'], [])
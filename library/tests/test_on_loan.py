@@ -0,0 +1,52 @@
+import io
+from datetime import datetime
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from library.models import Book, Borrow
+from library.services.books import get_actual_available_copies
+from library.tests.base import UserBookAPITest
+
+
+class OnLoanCounterTestSet(UserBookAPITest):
+    def test_borrow_increments_on_loan(self):
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.on_loan, 1)
+        self.assertEqual(self.book.available_now, self.sample_book['available_copies'] - 1)
+
+    def test_return_decrements_on_loan(self):
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.client.post(reverse('return book view'), {'isbn': self.book.isbn})
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.on_loan, 0)
+
+    def test_double_return_releases_once(self):
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.client.post(reverse('return book view'), {'isbn': self.book.isbn})
+        self.client.post(reverse('return book view'), {'isbn': self.book.isbn})
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.on_loan, 0)
+
+    def test_available_copies_costs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_actual_available_copies(self.book), self.sample_book['available_copies'])
+
+    def test_reconcile_command(self):
+        other = Book.objects.create(title='Other', author='Other', isbn='0000000000001', available_copies=1)
+        Borrow.objects.create(user=self.user, book=self.book)
+        Borrow.objects.create(user=self.admin_user, book=self.book)
+        Borrow.objects.create(user=self.user, book=other, returned_at=timezone.make_aware(datetime(2025, 6, 20, 12)))
+        Book.objects.filter(pk=other.pk).update(on_loan=5)
+
+        call_command('reconcile_on_loan', stdout=io.StringIO())
+
+        self.book.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.book.on_loan, 2)
+        self.assertEqual(other.on_loan, 0)
@@ -0,0 +1,84 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from library.models import Book, Borrow
+from library.tests.base import AdminBookAPITest
+
+CHECKED_TABLES = ('books', 'borrows')
+
+
+def explain(sql: str) -> list[str]:
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Tiny test tables are always cheaper to scan, make the planner prefer any usable index
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    scans = []
+    for line in plan:
+        for table in CHECKED_TABLES:
+            if f'Seq Scan on {table}' in line or line.strip() == f'SCAN {table}':
+                scans.append(line)
+    return scans
+
+
+class QueryPlanTestSet(AdminBookAPITest):
+    """Fails when a hot endpoint stops using an index on books or borrows."""
+
+    def setUp(self):
+        super().setUp()
+        self.other_book = Book.objects.create(title='Other', author='Other', isbn='0000000000001', available_copies=2)
+        Borrow.objects.create(user=self.normal_user, book=self.other_book)
+        Borrow.objects.create(user=self.normal_user, book=self.book, returned_at='2025-06-20T12:00:00Z')
+
+    def assertNoFullScans(self, method: str, url: str, data=None, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            getattr(self.client, method)(url, data, **kwargs)
+        statements = [query['sql'] for query in context.captured_queries
+                      if query['sql'].lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE'))]
+        self.assertTrue(statements)
+        for sql in statements:
+            plan = explain(sql)
+            self.assertEqual(full_scans(plan), [], f'{sql}\n' + '\n'.join(plan))
+
+    def test_list_books(self):
+        self.assertNoFullScans('get', reverse('books view'), {'cursor': 'IjAi'})
+
+    def test_list_books_sorted_and_filtered(self):
+        url = reverse('books view')
+        first = self.client.get(url, {'order': 'title', 'page_size': 1}).data['next']
+        self.assertNoFullScans('get', url, {'order': 'title', 'page_size': 1, 'cursor': first})
+        self.assertNoFullScans('get', url, {'author': 'Other', 'fields': 'isbn,title'})
+
+    def test_borrow_and_return(self):
+        self.assertNoFullScans('post', reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.assertNoFullScans('post', reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.assertNoFullScans('post', reverse('return book view'), {'isbn': self.book.isbn})
+        self.assertNoFullScans('post', reverse('return book view'), {'isbn': self.book.isbn})
+
+    def test_batch_borrow_and_return(self):
+        isbns = {'isbns': [self.book.isbn, self.other_book.isbn, '9999999999999']}
+        self.assertNoFullScans('post', reverse('batch borrow view'), isbns, format='json')
+        self.assertNoFullScans('post', reverse('batch return view'), isbns, format='json')
+
+    def test_batch_upsert(self):
+        books = [{'title': 'T', 'author': 'A', 'isbn': isbn, 'available_copies': 1}
+                 for isbn in (self.book.isbn, '9999999999999')]
+        self.assertNoFullScans('post', reverse('batch books view'), books, format='json')
+
+    def test_list_borrows(self):
+        url = reverse('list borrows view')
+        self.assertNoFullScans('get', url)
+        self.assertNoFullScans('get', url, {'isbn': self.book.isbn})
+        self.assertNoFullScans('get', url, {'user': self.normal_user.id})
+        self.assertNoFullScans('get', url, {'borrowed_after': '2025-01-01T00:00:00Z'})
+
+    def test_my_borrows(self):
+        self.authenticateAs(self.normal_user)
+        self.assertNoFullScans('get', reverse('my borrows view'))
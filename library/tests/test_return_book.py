@@ -1,6 +1,5 @@
-﻿import datetime
-
-from django.urls import reverse
+﻿from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
 from library.models import Borrow
@@ -44,7 +43,7 @@ class ReturnBookViewTestSet(UserBookAPITest):
         borrow = Borrow.objects.create(
             user=self.user,
             book=self.book,
-            returned_at=datetime.datetime.now()
+            returned_at=timezone.now()
         )
 
         url = reverse('return book view')
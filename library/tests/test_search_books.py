@@ -0,0 +1,60 @@
+import io
+
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+
+from library.models import Book
+from library.tests.base import AdminBookAPITest
+
+
+class SearchBooksTestSet(AdminBookAPITest):
+    def setUp(self):
+        super().setUp()
+        self.dune = Book.objects.create(title='Dune', author='Frank Herbert', isbn='0000000000001', available_copies=1)
+        self.messiah = Book.objects.create(title='Dune Messiah', author='Frank Herbert', isbn='0000000000002',
+                                           available_copies=1)
+        self.herbert = Book.objects.create(title='The Dune Encyclopedia', author='Willis McNelly',
+                                           isbn='0000000000003', available_copies=1)
+
+    def _search(self, text):
+        return self.client.get(reverse('search books view'), {'q': text})
+
+    def test_search_by_title_and_author(self):
+        response = self._search('dune herbert')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data['books']), sorted([str(self.dune), str(self.messiah)]))
+
+    def test_search_ranks_title_matches_first(self):
+        Book.objects.create(title='Other', author='Dune Fan', isbn='0000000000004', available_copies=1)
+        books = self._search('dune').data['books']
+        self.assertEqual(books[-1], 'Other by Dune Fan. ISBN: 0000000000004.')
+
+    def test_search_sees_added_books(self):
+        self._add_new_book()
+        self.assertEqual(self._search('new author').data['books'], ['New Book by New Author. ISBN: 9876543210123.'])
+
+    def test_search_ignores_control_characters(self):
+        response = self._search('dune\x00herbert')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data['books']), sorted([str(self.dune), str(self.messiah)]))
+
+        response = self._search('\x00\x1b')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['books'], [])
+
+    def test_search_ignores_query_syntax(self):
+        response = self._search('"dune OR AND (')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_search_requires_query(self):
+        self.assertEqual(self._search(' ').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_search_index(self):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM books_fts')
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(len(self._search('dune').data['books']), 3)
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import tracemalloc
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from library.tests.base import UserBookAPITest
+
+
+def metrics(response) -> dict[str, str]:
+    return dict(metric.strip().split(';', 1) for metric in response['Server-Timing'].split(','))
+
+
+class ServerTimingTestSet(UserBookAPITest):
+    def setUp(self):
+        super().setUp()
+        # Authenticate through the real JWT path so the middleware sees what production sees
+        self.unauthenticate()
+
+    def _get(self, user=None, **headers):
+        if user:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(user)}'
+        return self.client.get(reverse('books view'), **headers)
+
+    def test_server_timing_header(self):
+        with self.assertLogs('library.requests', 'INFO') as logs:
+            response = self._get()
+
+        self.assertEqual(set(metrics(response)), {'db', 'view', 'render', 'total'})
+        self.assertIn('desc="1 queries"', metrics(response)['db'])
+        record = logs.records[0]
+        self.assertEqual((record.view, record.status, record.db_queries), ('books view', 200, 1))
+        self.assertGreater(record.render_ms, 0)
+
+    def test_async_view_queries_counted(self):
+        response = self.client.get(reverse('async books view'))
+        self.assertIn('desc="1 queries"', metrics(response)['db'])
+
+    def test_profile_dump_for_staff_only(self):
+        with tempfile.TemporaryDirectory() as profile_dir, override_settings(LIBRARY_PROFILE_DIR=profile_dir):
+            self.assertNotIn('X-Profile-Dump', self._get(self.user, HTTP_X_PROFILE='1'))
+            self.assertNotIn('X-Profile-Dump', self._get(HTTP_X_PROFILE='1'))
+
+            response = self._get(self.admin_user, HTTP_X_PROFILE='1')
+            self.assertEqual(os.listdir(profile_dir), [response['X-Profile-Dump']])
+
+    def test_profile_dump_for_session_staff(self):
+        self.client.force_login(self.admin_user)
+        with tempfile.TemporaryDirectory() as profile_dir, override_settings(LIBRARY_PROFILE_DIR=profile_dir):
+            self.assertNotIn('X-Profile-Dump', self._get(HTTP_X_PROFILE='0'))
+
+            response = self._get(HTTP_X_PROFILE='1')
+            self.assertEqual(os.listdir(profile_dir), [response['X-Profile-Dump']])
+
+    def test_peak_allocation_when_tracing(self):
+        tracemalloc.start()
+        try:
+            response = self._get()
+        finally:
+            tracemalloc.stop()
+        self.assertRegex(metrics(response)['alloc'], r'desc="\d+ bytes peak"')
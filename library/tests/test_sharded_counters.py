@@ -0,0 +1,93 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+
+from library.models import Book, BookCounterSlot, Borrow
+from library.services.books import get_actual_available_copies
+from library.services.inventory import shard_counter
+from library.tests.base import UserBookAPITest
+
+
+class ShardedCounterTestSet(UserBookAPITest):
+    def setUp(self):
+        super().setUp()
+        call_command('shard_book_counter', self.book.isbn, slots=4, stdout=io.StringIO())
+        self.book.refresh_from_db()
+
+    def _slots(self):
+        return list(BookCounterSlot.objects.filter(book=self.book).order_by('slot').values_list('capacity', 'on_loan'))
+
+    def _borrow_as(self, user):
+        self.authenticateAs(user)
+        return self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+
+    def test_shard_splits_copies(self):
+        self.assertEqual(self.book.counter_slots, 4)
+        self.assertEqual(self._slots(), [(2, 0), (1, 0), (1, 0), (1, 0)])
+
+    def test_borrow_and_return_use_slots(self):
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.on_loan, 0)
+        self.assertEqual(sum(on_loan for _, on_loan in self._slots()), 1)
+        self.assertEqual(get_actual_available_copies(self.book), 4)
+
+        self.client.post(reverse('return book view'), {'isbn': self.book.isbn})
+        self.assertEqual(sum(on_loan for _, on_loan in self._slots()), 0)
+
+    def test_no_over_lending(self):
+        users = User.objects.bulk_create([User(username=f'reader{i}') for i in range(7)])
+        messages = [self._borrow_as(user).data['message'] for user in users]
+
+        self.assertEqual(messages.count('ok'), 5)
+        self.assertTrue(all(capacity == on_loan for capacity, on_loan in self._slots()))
+        self.assertEqual(Borrow.objects.filter(book=self.book, returned_at__isnull=True).count(), 5)
+
+    def test_batch_borrow_and_return(self):
+        self.client.post(reverse('batch borrow view'), {'isbns': [self.book.isbn]}, format='json')
+        self.assertEqual(sum(on_loan for _, on_loan in self._slots()), 1)
+        self.client.post(reverse('batch return view'), {'isbns': [self.book.isbn]}, format='json')
+        self.assertEqual(sum(on_loan for _, on_loan in self._slots()), 0)
+
+    def test_availability_sums_slots(self):
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+
+        response = self.client.post(reverse('books availability view'), {'isbns': [self.book.isbn]}, format='json')
+        self.assertEqual(response.data['availability'], {self.book.isbn: 4})
+        books = self.client.get(reverse('books view'), {'fields': 'isbn,available_now'}).data['books']
+        self.assertEqual(books, [{'isbn': self.book.isbn, 'available_now': 4}])
+
+    def test_available_filter_counts_slots(self):
+        Book.objects.filter(pk=self.book.pk).update(available_copies=1)
+        shard_counter(self.book.isbn, 2)
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+
+        books = self.client.get(reverse('books view'), {'available': 'true', 'fields': 'isbn'}).data['books']
+        self.assertEqual(books, [])
+
+    def test_restock_spreads_over_slots(self):
+        self.authenticateAs(self.admin_user)
+        self.client.post(reverse('books view'), self.sample_book | {'available_copies': 6})
+
+        self.assertEqual([capacity for capacity, _ in self._slots()], [4, 3, 2, 2])
+        self.book.refresh_from_db()
+        self.assertEqual(get_actual_available_copies(self.book), 11)
+
+    def test_reconcile_resplits_slots(self):
+        Borrow.objects.create(user=self.user, book=self.book)
+        Borrow.objects.create(user=self.admin_user, book=self.book)
+
+        call_command('reconcile_on_loan', stdout=io.StringIO())
+
+        self.assertEqual(self._slots(), [(2, 2), (1, 0), (1, 0), (1, 0)])
+
+    def test_unshard_folds_counter_back(self):
+        self.client.post(reverse('borrow book view'), {'isbn': self.book.isbn})
+
+        call_command('shard_book_counter', self.book.isbn, slots=0, stdout=io.StringIO())
+
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.counter_slots, self.book.on_loan), (0, 1))
+        self.assertEqual(self._slots(), [])
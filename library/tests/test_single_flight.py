@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from library.services.singleflight import asingle_flight, single_flight
+
+
+@override_settings(LIBRARY_SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+class SingleFlightTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def _slow_compute(self):
+        with self.calls_lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return {'value': 42}
+
+    def test_concurrent_misses_compute_once(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(single_flight('key', self._slow_compute, 60)))
+                   for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'value': 42}] * 20)
+
+    def test_waits_for_other_process(self):
+        cache.add('key:lock', 'other process', timeout=60)
+        threading.Timer(0.1, lambda: cache.set('key', {'value': 'theirs'})).start()
+
+        self.assertEqual(single_flight('key', self._slow_compute, 60), {'value': 'theirs'})
+        self.assertEqual(self.calls, 0)
+
+    def test_falls_back_after_timeout(self):
+        cache.add('key:lock', 'stuck process', timeout=60)
+
+        self.assertEqual(single_flight('key', self._slow_compute, 60, timeout=0.1), {'value': 42})
+        self.assertEqual(self.calls, 1)
+
+    def test_hit_does_not_compute(self):
+        cache.set('key', {'value': 'cached'})
+        self.assertEqual(single_flight('key', self._slow_compute, 60), {'value': 'cached'})
+        self.assertEqual(self.calls, 0)
+
+    def test_lock_released_on_error(self):
+        def fail():
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            single_flight('key', fail, 60)
+        self.assertIsNone(cache.get('key:lock'))
+
+    async def test_async_concurrent_misses_compute_once(self):
+        async def compute():
+            self.calls += 1
+            await asyncio.sleep(0.1)
+            return {'value': 42}
+
+        results = await asyncio.gather(*(asingle_flight('akey', compute, 60) for _ in range(20)))
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'value': 42}] * 20)
+        self.assertEqual(await asingle_flight('akey', compute, 60), {'value': 42})
+        self.assertEqual(self.calls, 1)
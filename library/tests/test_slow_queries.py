@@ -0,0 +1,103 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from library.models import Book
+from library.slowqueries import explain, fingerprint, normalize, slow_queries
+from library.tests.base import UserBookAPITest
+
+
+class NormalizeTestSet(UserBookAPITest):
+    def test_literals_and_lists_collapsed(self):
+        self.assertEqual(
+            normalize('SELECT "a"."id" FROM "a"  WHERE "a"."isbn" IN (%s, %s, %s) AND "a"."n" > 5 LIMIT 21'),
+            'SELECT "a"."id" FROM "a" WHERE "a"."isbn" IN (?, ...) AND "a"."n" > ? LIMIT ?')
+        self.assertEqual(normalize("INSERT INTO t VALUES (%s, 'x'), (%s, 'y'), (%s, 'z')"),
+                         'INSERT INTO t VALUES (?, ...), ...')
+
+    def test_same_fingerprint_for_any_list_length(self):
+        self.assertEqual(fingerprint(normalize('SELECT 1 FROM t WHERE id IN (%s)')),
+                         fingerprint(normalize('SELECT 1 FROM t WHERE id IN (%s, %s, %s, %s)')))
+
+
+@override_settings(LIBRARY_SLOW_QUERY_THRESHOLD=0)
+class SlowQueryLogTestSet(UserBookAPITest):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(LIBRARY_SLOW_QUERY_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        slow_queries.reset()
+        self.addCleanup(slow_queries.reset)
+        super().setUp()
+
+    def test_logged_with_view_and_plan(self):
+        with self.assertLogs('library.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('books view'), {'author': 'Test Author'})
+
+        record = logs.records[0]
+        self.assertEqual(record.view, 'books view')
+        self.assertTrue(record.sql.startswith('SELECT'))
+        self.assertIn('SEARCH books USING INDEX books_by_author', record.plan)
+        self.assertEqual(len(record.params_fingerprint), 16)
+
+    def _list_by_author(self, author):
+        # Each author is its own cached page, but all of them are the same query
+        self.client.get(reverse('books view'), {'author': author, 'fields': 'isbn'})
+
+    def test_repeats_aggregated(self):
+        with self.assertLogs('library.slow_queries', 'WARNING') as logs:
+            for author in ('A', 'B', 'C'):
+                self._list_by_author(author)
+
+        fingerprints = [record.fingerprint for record in logs.records]
+        self.assertEqual(len(fingerprints), len(set(fingerprints)))
+        listing = next(query for query in slow_queries.queries() if 'WHERE' in query.sql)
+        self.assertEqual(listing.count, 3)
+
+    def test_repeats_summarised_after_interval(self):
+        with self.assertLogs('library.slow_queries', 'WARNING'):
+            self._list_by_author('A')
+            self._list_by_author('B')
+        with override_settings(LIBRARY_SLOW_QUERY_LOG_INTERVAL=0), \
+                self.assertLogs('library.slow_queries', 'WARNING') as logs:
+            self._list_by_author('C')
+
+        messages = [record.getMessage() for record in logs.records]
+        self.assertTrue(any('repeated 1 times, 3 in total' in message for message in messages), messages)
+
+    def test_failed_explain_keeps_transaction_usable(self):
+        with transaction.atomic(), CaptureQueriesContext(connection) as context:
+            plan = explain(connection, 'SELECT * FROM no_such_table WHERE id = %s', [1])
+            self.assertEqual(Book.objects.count(), 1)
+
+        self.assertTrue(plan.startswith('EXPLAIN failed'))
+        # Savepoint statements go through the backend cursor, so only the count was captured
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_other_modules_ignored(self):
+        with self.assertNoLogs('library.slow_queries', 'WARNING'):
+            Book.objects.filter(author='Test Author').count()
+
+    def test_command_prints_top_fingerprints(self):
+        with self.assertLogs('library.slow_queries', 'WARNING'):
+            self.client.get(reverse('books view'), {'author': 'Test Author'})
+            self.client.get(reverse('my borrows view'))
+
+        out = StringIO()
+        call_command('slow_queries', '--top', '1', '--plans', stdout=out)
+        output = out.getvalue()
+        self.assertEqual(output.count('total '), 1)
+        self.assertIn('SELECT', output)
+
+        call_command('slow_queries', '--clear', stdout=StringIO())
+        out = StringIO()
+        call_command('slow_queries', stdout=out)
+        self.assertIn('No slow queries recorded', out.getvalue())
@@ -1,10 +1,26 @@
 from django.urls import path
 
-from library.views import books_view, borrow_book, return_book, list_borrows
+from library.views import books_view, borrow_book, return_book, list_borrows, export_books_view, \
+    batch_books_view, borrow_books_batch, return_books_batch, list_my_borrows, \
+    search_books_view, autocomplete_books_view, books_availability_view, list_changes_view, \
+    async_books_view, async_books_availability_view, async_list_borrows, async_list_my_borrows
 
 urlpatterns = [
     path('books/', books_view, name='books view'),
+    path('books/availability/', books_availability_view, name='books availability view'),
+    path('books/batch/', batch_books_view, name='batch books view'),
+    path('books/search/', search_books_view, name='search books view'),
+    path('books/autocomplete/', autocomplete_books_view, name='autocomplete books view'),
+    path('books/export/', export_books_view, name='export books view'),
     path('borrow/', borrow_book, name='borrow book view'),
+    path('borrow/batch/', borrow_books_batch, name='batch borrow view'),
     path('return/', return_book, name='return book view'),
+    path('return/batch/', return_books_batch, name='batch return view'),
     path('borrows/', list_borrows, name='list borrows view'),
+    path('borrows/mine/', list_my_borrows, name='my borrows view'),
+    path('changes/', list_changes_view, name='list changes view'),
+    path('async/books/', async_books_view, name='async books view'),
+    path('async/books/availability/', async_books_availability_view, name='async books availability view'),
+    path('async/borrows/', async_list_borrows, name='async list borrows view'),
+    path('async/borrows/mine/', async_list_my_borrows, name='async my borrows view'),
 ]
@@ -1,28 +1,79 @@
-from django.utils import timezone
+import json
+import re
+from dataclasses import asdict
+from typing import Optional
 
-from library.models import Book, Borrow
-from library.services.books import list_books, add_or_increase_book, BookValidator, BookValidatorMode, \
-    get_actual_available_copies
+from auth_api.authentication import async_jwt_view, not_authenticated
+from library import metrics
+from library.services.books import add_or_increase_book, BookValidator, BookValidatorMode, upsert_books, \
+    get_books_page, get_availability, BookListQuery, aget_books_page, aget_availability
+from library.services.autocomplete import suggest
+from library.services.borrows import BorrowOutcome, lend_book, take_back_book, lend_books, take_back_books, \
+    list_open_borrows, list_user_borrows, alist_open_borrows, alist_user_borrows
+from library.services.catalog import aget_catalog_version, catalog_etag, get_catalog_version
+from library.services.changes import ChangesPruned, list_changes
+from library.services.export import EXPORT_FORMATS, export_books
+from library.services.pagination import InvalidCursor, InvalidPageSize, parse_page_size
+from library.services.search import search_books
 
-from django.http import HttpRequest
-from rest_framework.decorators import api_view
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_405_METHOD_NOT_ALLOWED, \
-    HTTP_500_INTERNAL_SERVER_ERROR, HTTP_404_NOT_FOUND
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND, \
+    HTTP_304_NOT_MODIFIED, HTTP_410_GONE
 
 
 @api_view(['GET', 'POST'])
 def books_view(request: HttpRequest) -> Response:
     if request.method == 'GET':
-        return create_books_list_response()
+        return create_books_list_response(request)
     else: # elif request.method == 'POST':
         if not request.user.is_staff:
             return Response({'message': 'Admin privileges required'}, status=HTTP_403_FORBIDDEN)
         return handle_book_creation(request)
 
 
-def create_books_list_response() -> Response:
-    return Response({'books': list_books()}, status=HTTP_200_OK)
+def parse_books_list_params(params) -> tuple[Optional[tuple[int, BookListQuery]], Optional[str]]:
+    try:
+        page_size = parse_page_size(params.get('page_size'))
+    except InvalidPageSize:
+        return None, 'Invalid page size'
+    query, err = BookValidator.validate_list_query(params)
+    if err:
+        return None, err
+    return (page_size, query), None
+
+
+def books_list_etag(version: int, cursor: Optional[str], page_size: int, query: BookListQuery,
+                    renderer_format: str) -> str:
+    return catalog_etag(version, {'cursor': cursor, 'page_size': page_size, **asdict(query),
+                                  'format': renderer_format})
+
+
+def create_books_list_response(request: HttpRequest) -> Response:
+    params, err = parse_books_list_params(request.GET)
+    if err:
+        return Response({'message': err}, status=HTTP_400_BAD_REQUEST)
+    page_size, query = params
+    cursor = request.GET.get('cursor')
+
+    version = get_catalog_version()
+    etag = books_list_etag(version, cursor, page_size, query, request.accepted_renderer.format)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return Response(status=HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    try:
+        payload = get_books_page(version, cursor, page_size, query)
+    except InvalidCursor:
+        return Response({'message': 'Invalid cursor'}, status=HTTP_400_BAD_REQUEST)
+    return Response(payload, status=HTTP_200_OK, headers={'ETag': etag})
 
 
 def handle_book_creation(request: HttpRequest) -> Response:
@@ -41,47 +92,264 @@ def handle_book_creation(request: HttpRequest) -> Response:
     return Response({'message': 'ok'}, status=HTTP_200_OK)
 
 
+@api_view(['GET'])
+def search_books_view(request: HttpRequest) -> Response:
+    text = request.GET.get('q', '')
+    if not text.strip():
+        return Response({'message': 'Please provide search query'}, status=HTTP_400_BAD_REQUEST)
+    try:
+        limit = parse_page_size(request.GET.get('page_size'))
+    except InvalidPageSize:
+        return Response({'message': 'Invalid page size'}, status=HTTP_400_BAD_REQUEST)
+    return Response({'books': [str(book) for book in search_books(text, limit)]}, status=HTTP_200_OK)
+
+
+@api_view(['GET'])
+def autocomplete_books_view(request: HttpRequest) -> Response:
+    try:
+        limit = int(request.GET.get('limit', settings.LIBRARY_AUTOCOMPLETE_LIMIT))
+    except ValueError:
+        return Response({'message': 'Invalid limit'}, status=HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, settings.LIBRARY_AUTOCOMPLETE_MAX_LIMIT))
+    suggestions = suggest(request.GET.get('q', ''), limit)
+    return Response({'suggestions': [{'kind': suggestion.kind, 'text': suggestion.text, 'isbn': suggestion.isbn}
+                                     for suggestion in suggestions]}, status=HTTP_200_OK)
+
+
+@api_view(['POST'])
+def books_availability_view(request: HttpRequest) -> Response:
+    isbns, err = BookValidator.validate_isbn_list(request.data)
+    if err:
+        return Response({'message': err}, status=HTTP_400_BAD_REQUEST)
+    return Response({'availability': get_availability(isbns)}, status=HTTP_200_OK)
+
+
+@api_view(['POST'])
+def batch_books_view(request: HttpRequest) -> Response:
+    if not request.user.is_staff:
+        return Response({'message': 'Admin privileges required'}, status=HTTP_403_FORBIDDEN)
+
+    items = request.data
+    if not isinstance(items, list):
+        return Response({'message': 'Expected a JSON array of books'}, status=HTTP_400_BAD_REQUEST)
+    if len(items) > settings.LIBRARY_BATCH_MAX_BOOKS:
+        return Response({'message': f'At most {settings.LIBRARY_BATCH_MAX_BOOKS} books per request'},
+                        status=HTTP_400_BAD_REQUEST)
+
+    results = []
+    valid = []
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({'isbn': None, 'result': 'error', 'message': 'Expected a JSON object'})
+            continue
+        book_data, err = BookValidator.validate_data(item)
+        if err:
+            results.append({'isbn': item.get('isbn'), 'result': 'error', 'message': err})
+            continue
+        results.append({'isbn': book_data.isbn, 'result': None})
+        valid.append(book_data)
+
+    outcomes = upsert_books(valid)
+    for result in results:
+        if result['result'] is None:
+            result['result'] = outcomes[result['isbn']]
+
+    return Response({'results': results}, status=HTTP_200_OK)
+
+
+@api_view(['GET'])
+def export_books_view(request: HttpRequest) -> StreamingHttpResponse | Response:
+    export_format = request.GET.get('output', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return Response({'message': f"Unsupported export format, use one of: {', '.join(EXPORT_FORMATS)}"},
+                        status=HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(export_books(export_format), content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="books.{export_format}"'
+    return response
+
+
 @api_view(['POST'])
 def borrow_book(request: HttpRequest) -> Response:
-    queried_book, err_response = BookValidator.get_queried_book_by_request(request)
-    if err_response:
-        return err_response
-    if get_actual_available_copies(queried_book) < 1:
-        return Response({'message': f"{str(queried_book)} isn't available."}, status=HTTP_200_OK)
-
-    borrow = Borrow.objects.filter(user=request.user, book=queried_book).first()
-    if borrow:
+    book_data, err = BookValidator.validate_request(request, BookValidatorMode.Isbn)
+    if err:
+        return Response({'message': err}, status=HTTP_400_BAD_REQUEST)
+
+    result = lend_book(request.user, book_data.isbn)
+    if result.outcome == BorrowOutcome.NotFound:
+        return Response({'message': 'Book not found'}, status=HTTP_404_NOT_FOUND)
+    if result.outcome == BorrowOutcome.Unavailable:
+        return Response({'message': f"{str(result.book)} isn't available."}, status=HTTP_200_OK)
+    if result.outcome == BorrowOutcome.AlreadyBorrowed:
         return Response(
-            {'message': f"User has already borrowed {str(queried_book)} and cannot borrow twice: {str(borrow)}"},
+            {'message': f"User has already borrowed {str(result.book)} and cannot borrow twice: {str(result.borrow)}"},
             status=HTTP_200_OK)
 
-    Borrow.objects.create(
-        user=request.user,
-        book=queried_book,
-    ).save()
-
     return Response({'message': 'ok'}, status=HTTP_200_OK)
 
 
 @api_view(['POST'])
 def return_book(request: HttpRequest) -> Response:
-    queried_book, err_response = BookValidator.get_queried_book_by_request(request)
-    if err_response:
-        return err_response
-    borrow = Borrow.objects.filter(user=request.user, book=queried_book).first()
-    if not borrow:
+    book_data, err = BookValidator.validate_request(request, BookValidatorMode.Isbn)
+    if err:
+        return Response({'message': err}, status=HTTP_400_BAD_REQUEST)
+
+    result = take_back_book(request.user, book_data.isbn)
+    if result.outcome == BorrowOutcome.NotFound:
+        return Response({'message': 'Book not found'}, status=HTTP_404_NOT_FOUND)
+    if result.outcome == BorrowOutcome.NotBorrowed:
         return Response({'message': 'User didn\'t borrow specified book before'}, status=HTTP_404_NOT_FOUND)
-    if borrow.returned_at:
+    if result.outcome == BorrowOutcome.AlreadyReturned:
         return Response({'message': 'User already returned specified book'}, status=HTTP_400_BAD_REQUEST)
-    borrow.returned_at = timezone.now()
-    borrow.save()
 
     return Response({'message': 'ok'}, status=HTTP_200_OK)
 
 
+@api_view(['POST'])
+def borrow_books_batch(request: HttpRequest) -> Response:
+    isbns, err = BookValidator.validate_isbn_list(request.data)
+    if err:
+        return Response({'message': err}, status=HTTP_400_BAD_REQUEST)
+    outcomes = lend_books(request.user, isbns)
+    return Response({'results': [{'isbn': isbn, 'result': outcome.value} for isbn, outcome in outcomes.items()]},
+                    status=HTTP_200_OK)
+
+
+@api_view(['POST'])
+def return_books_batch(request: HttpRequest) -> Response:
+    isbns, err = BookValidator.validate_isbn_list(request.data)
+    if err:
+        return Response({'message': err}, status=HTTP_400_BAD_REQUEST)
+    outcomes = take_back_books(request.user, isbns)
+    return Response({'results': [{'isbn': isbn, 'result': outcome.value} for isbn, outcome in outcomes.items()]},
+                    status=HTTP_200_OK)
+
+
 @api_view(['GET'])
 def list_borrows(request: HttpRequest) -> Response:
     if not request.user.is_staff:
         return Response({'message': 'Admin privileges required'}, status=HTTP_403_FORBIDDEN)
-    return Response({'list': [str(borrow) for borrow in Borrow.objects.filter(returned_at__isnull=True)]},
-                    status=HTTP_200_OK)
+
+    filters, err = parse_borrows_filters(request.GET)
+    if err:
+        return Response({'message': err}, status=HTTP_400_BAD_REQUEST)
+    try:
+        page_size = parse_page_size(request.GET.get('page_size'))
+        borrows, next_cursor = list_open_borrows(request.GET.get('cursor'), page_size, **filters)
+    except InvalidPageSize:
+        return Response({'message': 'Invalid page size'}, status=HTTP_400_BAD_REQUEST)
+    except InvalidCursor:
+        return Response({'message': 'Invalid cursor'}, status=HTTP_400_BAD_REQUEST)
+    return Response({'list': borrows, 'next': next_cursor}, status=HTTP_200_OK)
+
+
+def parse_borrows_filters(params) -> tuple[Optional[dict], Optional[str]]:
+    user_id = params.get('user')
+    if user_id and not re.fullmatch(r'[0-9]+', user_id):
+        return None, 'Invalid user'
+    filters = {'user_id': int(user_id) if user_id else None, 'isbn': params.get('isbn')}
+    for param in ('borrowed_after', 'borrowed_before'):
+        if not params.get(param):
+            continue
+        try:
+            value = parse_datetime(params[param])
+        except ValueError:
+            value = None
+        if value is None:
+            return None, f'Invalid {param}, use ISO 8601'
+        filters[param] = value if timezone.is_aware(value) else timezone.make_aware(value)
+    return filters, None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_my_borrows(request: HttpRequest) -> Response:
+    return Response({'list': list_user_borrows(request.user.pk)}, status=HTTP_200_OK)
+
+
+@api_view(['GET'])
+def list_changes_view(request: HttpRequest) -> Response:
+    since = request.GET.get('since', '0')
+    if not re.fullmatch(r'[0-9]+', since):
+        return Response({'message': 'Invalid since'}, status=HTTP_400_BAD_REQUEST)
+    try:
+        page_size = parse_page_size(request.GET.get('page_size'))
+    except InvalidPageSize:
+        return Response({'message': 'Invalid page size'}, status=HTTP_400_BAD_REQUEST)
+    try:
+        changes, next_since, more = list_changes(int(since), page_size)
+    except ChangesPruned:
+        return Response({'message': 'Changes since then were pruned, resync from /api/books/export/'},
+                        status=HTTP_410_GONE)
+    return Response({'changes': changes, 'next': next_since, 'more': more}, status=HTTP_200_OK)
+
+
+# Native async versions of the read endpoints. They skip DRF (which has no async views) and under ASGI
+# run on the event loop instead of taking a worker thread each, so slow clients only cost a coroutine.
+# Responses are always JSON and have the same shape as their DRF counterparts.
+
+@require_GET
+@async_jwt_view
+async def async_books_view(request: HttpRequest) -> HttpResponse:
+    params, err = parse_books_list_params(request.GET)
+    if err:
+        return JsonResponse({'message': err}, status=HTTP_400_BAD_REQUEST)
+    page_size, query = params
+    cursor = request.GET.get('cursor')
+
+    version = await aget_catalog_version()
+    etag = books_list_etag(version, cursor, page_size, query, 'json')
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return HttpResponse(status=HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    try:
+        payload = await aget_books_page(version, cursor, page_size, query)
+    except InvalidCursor:
+        return JsonResponse({'message': 'Invalid cursor'}, status=HTTP_400_BAD_REQUEST)
+    return JsonResponse(payload, status=HTTP_200_OK, headers={'ETag': etag})
+
+
+@csrf_exempt
+@require_POST
+@async_jwt_view
+async def async_books_availability_view(request: HttpRequest) -> HttpResponse:
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        data = None
+    isbns, err = BookValidator.validate_isbn_list(data)
+    if err:
+        return JsonResponse({'message': err}, status=HTTP_400_BAD_REQUEST)
+    return JsonResponse({'availability': await aget_availability(isbns)}, status=HTTP_200_OK)
+
+
+@require_GET
+@async_jwt_view
+async def async_list_borrows(request: HttpRequest) -> HttpResponse:
+    if not request.user.is_staff:
+        return JsonResponse({'message': 'Admin privileges required'}, status=HTTP_403_FORBIDDEN)
+
+    filters, err = parse_borrows_filters(request.GET)
+    if err:
+        return JsonResponse({'message': err}, status=HTTP_400_BAD_REQUEST)
+    try:
+        page_size = parse_page_size(request.GET.get('page_size'))
+        borrows, next_cursor = await alist_open_borrows(request.GET.get('cursor'), page_size, **filters)
+    except InvalidPageSize:
+        return JsonResponse({'message': 'Invalid page size'}, status=HTTP_400_BAD_REQUEST)
+    except InvalidCursor:
+        return JsonResponse({'message': 'Invalid cursor'}, status=HTTP_400_BAD_REQUEST)
+    return JsonResponse({'list': borrows, 'next': next_cursor}, status=HTTP_200_OK)
+
+
+@require_GET
+@async_jwt_view
+async def async_list_my_borrows(request: HttpRequest) -> HttpResponse:
+    if not request.user.is_authenticated:
+        return not_authenticated(request)
+    return JsonResponse({'list': await alist_user_borrows(request.user.pk)}, status=HTTP_200_OK)
+
+
+@require_GET
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Prometheus scrape target, summed over all worker processes sharing LIBRARY_METRICS_DIR."""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Compares the WSGI read path (DRF views, one worker thread per request) with the native async
+ASGI read path (/api/async/...) when many clients read slowly.
+
+Both applications are driven in-process against a throwaway test database. Every client takes
+--latency seconds to receive its response, like a client on a slow link: a WSGI worker thread is
+held for that time, an ASGI request only keeps a suspended coroutine. WSGI gets --threads worker
+threads, like a threaded gunicorn worker; ASGI serves every client from one event loop.
+
+Django's ASGI handler still gives every request its own executor for thread-sensitive sync calls,
+and the async ORM and the locmem cache go through it, so the peak thread count stays high under ASGI.
+Those threads sit idle while the client reads, though; they don't cap throughput like WSGI workers do.
+
+    python tools/bench_async_reads.py --clients 300 --threads 16 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+# Also puts the project on sys.path and sets Django up
+from bench_borrow_contention import use_file_database
+
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test.utils import setup_test_environment
+
+from library.models import Book
+
+QUERY = 'page_size=50&fields=isbn,title,available_now'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=16, help='WSGI worker threads')
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds each client takes to read a response')
+    parser.add_argument('--books', type=int, default=1000)
+    return parser.parse_args()
+
+
+class PeakThreads:
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def _watch(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_wsgi(args) -> tuple[list[float], list[int]]:
+    app = get_wsgi_application()
+
+    def request() -> tuple[float, int]:
+        started = time.perf_counter()
+        statuses = []
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/books/', 'QUERY_STRING': QUERY,
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'HTTP_ACCEPT': 'application/json',
+            'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+        }
+        body = app(environ, lambda status, headers: statuses.append(int(status.split()[0])))
+        for _ in body:
+            # The worker thread is stuck writing to the slow client
+            time.sleep(args.latency)
+        body.close()
+        connections.close_all()
+        return time.perf_counter() - started, statuses[0]
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda _: request(), range(args.clients)))
+    return [elapsed for elapsed, _ in results], [status for _, status in results]
+
+
+def run_asgi(args) -> tuple[list[float], list[int]]:
+    app = get_asgi_application()
+
+    async def request() -> tuple[float, int]:
+        started = time.perf_counter()
+        statuses = []
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/api/async/books/', 'raw_path': b'/api/async/books/',
+            'query_string': QUERY.encode(), 'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+        }
+
+        requested = False
+        done = asyncio.Event()
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+            elif message['type'] == 'http.response.body':
+                if message.get('body'):
+                    await asyncio.sleep(args.latency)
+                if not message.get('more_body'):
+                    done.set()
+
+        await app(scope, receive, send)
+        return time.perf_counter() - started, statuses[0]
+
+    async def main():
+        return await asyncio.gather(*(request() for _ in range(args.clients)))
+
+    results = asyncio.run(main())
+    return [elapsed for elapsed, _ in results], [status for _, status in results]
+
+
+def report(name: str, run, args) -> bool:
+    with PeakThreads() as threads:
+        started = time.perf_counter()
+        latencies, statuses = run(args)
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{name}: {args.clients} requests in {elapsed:.2f}s ({args.clients / elapsed:.0f} req/s), '
+          f'p50={statistics.median(latencies) * 1000:.0f}ms p99={p99 * 1000:.0f}ms, peak threads={threads.peak}')
+    return all(status == 200 for status in statuses)
+
+
+def main() -> int:
+    args = parse_args()
+    use_file_database()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        Book.objects.bulk_create([Book(title=f'Book {i}', author=f'Author {i % 50}', isbn=f'{i:013d}',
+                                       available_copies=3) for i in range(args.books)])
+        ok = report('wsgi', run_wsgi, args)
+        ok = report('asgi', run_asgi, args) and ok
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print('correct' if ok else 'INCORRECT')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
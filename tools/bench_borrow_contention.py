@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark for library.services.borrows.lend_book/take_back_book.
+
+Runs against a throwaway test database. Hundreds of threads hit the same ISBN:
+first all at once to check that no copy is over-lent, then in borrow/return loops
+to measure throughput.
+
+    python tools/bench_borrow_contention.py --clients 200 --copies 50 --rounds 20
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProject4.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, connections, OperationalError  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from library.models import Book, Borrow  # noqa: E402
+from library.services.borrows import BorrowOutcome, lend_book, take_back_book  # noqa: E402
+
+ISBN = '9780000000000'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--copies', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=20, help='borrow/return cycles per client')
+    return parser.parse_args()
+
+
+def use_file_database():
+    """SQLite in-memory test databases can't be shared across threads, so point the test DB to a file."""
+    db = settings.DATABASES['default']
+    if db['ENGINE'] == 'django.db.backends.sqlite3':
+        db.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+        db.setdefault('OPTIONS', {}).update({'timeout': 60, 'transaction_mode': 'IMMEDIATE'})
+
+
+def run_clients(users, work):
+    barrier = threading.Barrier(len(users))
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def client(user):
+        barrier.wait()
+        try:
+            local = work(user)
+        finally:
+            connections.close_all()
+        with lock:
+            outcomes.update(local)
+
+    threads = [threading.Thread(target=client, args=(user,)) for user in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, time.perf_counter() - started
+
+
+def call(operation, user):
+    while True:
+        try:
+            return operation(user, ISBN).outcome
+        except OperationalError:
+            # SQLite reports "database is locked" instead of waiting forever; just retry.
+            time.sleep(0.001)
+
+
+def main() -> int:
+    args = parse_args()
+    use_file_database()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        users = User.objects.bulk_create([User(username=f'bench{i}') for i in range(args.clients)])
+        Book.objects.create(title='Bestseller', author='Bench', isbn=ISBN, available_copies=args.copies)
+
+        outcomes, elapsed = run_clients(users, lambda user: [call(lend_book, user)])
+        book = Book.objects.get(pk=ISBN)
+        open_borrows = Borrow.objects.filter(book=book, returned_at__isnull=True).count()
+        expected = min(args.copies, args.clients)
+        print(f'burst: {args.clients} clients in {elapsed:.3f}s -> '
+              + ', '.join(f'{outcome.value}={count}' for outcome, count in outcomes.items()))
+        print(f'burst: on_loan={book.on_loan} open_borrows={open_borrows} expected={expected}')
+        ok = outcomes[BorrowOutcome.Ok] == book.on_loan == open_borrows == expected
+
+        for user in users:
+            take_back_book(user, ISBN)
+
+        def cycle(user):
+            local = Counter()
+            for _ in range(args.rounds):
+                outcome = call(lend_book, user)
+                local[outcome] += 1
+                if outcome == BorrowOutcome.Ok:
+                    call(take_back_book, user)
+            return local
+
+        outcomes, elapsed = run_clients(users, cycle)
+        operations = args.clients * args.rounds
+        book.refresh_from_db()
+        open_borrows = Borrow.objects.filter(book=book, returned_at__isnull=True).count()
+        print(f'loop: {operations} borrow attempts in {elapsed:.3f}s ({operations / elapsed:.0f} ops/s) -> '
+              + ', '.join(f'{outcome.value}={count}' for outcome, count in outcomes.items() if count))
+        print(f'loop: on_loan={book.on_loan} open_borrows={open_borrows} expected=0')
+        ok = ok and book.on_loan == open_borrows == 0
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print('correct' if ok else 'INCORRECT')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Measures /api/books/ latency while a burst of sign-ups runs in parallel, with password hashing
+inline in the request threads and then on the bounded hashing pool (auth_api.hashing).
+
+Both phases drive the WSGI application in-process from threads, like a threaded WSGI server,
+against a throwaway test database. Register clients come from distinct IPs so the throttles
+don't hide the effect.
+
+    python tools/bench_register_load.py --readers 8 --registrations 32 --seconds 10
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from io import BytesIO
+
+# Also puts the project on sys.path and sets Django up
+from bench_borrow_contention import use_file_database
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test.utils import setup_test_environment
+
+from auth_api import hashing
+from library.models import Book
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8, help='threads reading /api/books/')
+    parser.add_argument('--registrations', type=int, default=32, help='threads registering users')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=2, help='hashing pool size of the second phase')
+    return parser.parse_args()
+
+
+def call(app, method: str, path: str, body: bytes = b'', remote_addr: str = '127.0.0.1') -> int:
+    statuses = []
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': '', 'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)), 'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+        'REMOTE_ADDR': remote_addr, 'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': BytesIO(body), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+    }
+    body_iter = app(environ, lambda status, headers: statuses.append(int(status.split()[0])))
+    for _ in body_iter:
+        pass
+    body_iter.close()
+    return statuses[0]
+
+
+def run_phase(app, args, phase: str) -> list[float]:
+    stop = threading.Event()
+    latencies = []
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def reader():
+        local = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            call(app, 'GET', '/api/books/')
+            local.append(time.perf_counter() - started)
+        connections.close_all()
+        with lock:
+            latencies.extend(local)
+
+    def registrar(index: int):
+        count = 0
+        while not stop.is_set():
+            body = f'{{"username": "{phase}-{index}-{count}", "password": "benchmark-password"}}'.encode()
+            status = call(app, 'POST', '/auth_api/register/', body, remote_addr=f'10.{index // 250}.{index % 250}.1')
+            with lock:
+                outcomes[status] += 1
+            count += 1
+        connections.close_all()
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=registrar, args=(i,)) for i in range(args.registrations)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{phase}: {len(latencies)} reads, p50={statistics.median(latencies) * 1000:.1f}ms '
+          f'p99={p99 * 1000:.1f}ms; register responses '
+          + ', '.join(f'{status}={count}' for status, count in sorted(outcomes.items())))
+    return latencies
+
+
+def main() -> int:
+    args = parse_args()
+    use_file_database()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    settings.AUTH_API_THROTTLE_RATES = {'ip': (10 ** 6, 10 ** 6), 'username': (10 ** 6, 10 ** 6)}
+    try:
+        Book.objects.bulk_create([Book(title=f'Book {i}', author='Bench', isbn=f'{i:013d}', available_copies=3)
+                                  for i in range(1000)])
+        app = get_wsgi_application()
+
+        settings.AUTH_API_HASHING_WORKERS = 0
+        run_phase(app, args, 'inline')
+
+        settings.AUTH_API_HASHING_WORKERS = args.workers
+        hashing.pool = hashing.HashingPool()
+        run_phase(app, args, f'pool of {args.workers}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compares borrow/return throughput on a single hot book with its on_loan counter kept on
+the book row versus spread over counter slots, at increasing numbers of concurrent clients.
+
+Runs against a throwaway test database. Note that SQLite serializes all writers on one
+database lock, so slots can't help there; point DATABASES at PostgreSQL to see row-lock
+contention go away.
+
+    python tools/bench_sharded_counters.py --clients 8 32 128 --slots 8 --rounds 20
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+
+# Also puts the project on sys.path and sets Django up
+from bench_borrow_contention import run_clients, use_file_database
+
+from django.contrib.auth.models import User
+from django.db import connection, OperationalError
+from django.test.utils import setup_test_environment
+
+from library.models import Book, Borrow
+from library.services.borrows import BorrowOutcome, lend_book, take_back_book
+from library.services.inventory import shard_counter
+
+ISBN = '9780000000001'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--slots', type=int, default=8)
+    parser.add_argument('--copies', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=20, help='borrow/return cycles per client')
+    return parser.parse_args()
+
+
+def call(operation, user):
+    while True:
+        try:
+            return operation(user, ISBN).outcome
+        except OperationalError:
+            time.sleep(0.001)
+
+
+def measure(users, rounds):
+    def cycle(user):
+        local = Counter()
+        for _ in range(rounds):
+            outcome = call(lend_book, user)
+            local[outcome] += 1
+            if outcome == BorrowOutcome.Ok:
+                call(take_back_book, user)
+        return local
+
+    outcomes, elapsed = run_clients(users, cycle)
+    return len(users) * rounds / elapsed, outcomes
+
+
+def main() -> int:
+    args = parse_args()
+    use_file_database()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    ok = True
+    try:
+        all_users = User.objects.bulk_create([User(username=f'bench{i}') for i in range(max(args.clients))])
+        Book.objects.create(title='Bestseller', author='Bench', isbn=ISBN, available_copies=args.copies)
+
+        print(f'{"clients":>8} {"single row ops/s":>18} {f"{args.slots} slots ops/s":>18}')
+        for clients in args.clients:
+            users = all_users[:clients]
+            rates = []
+            for slots in (0, args.slots):
+                shard_counter(ISBN, slots, on_loan=0)
+                rate, _ = measure(users, args.rounds)
+                rates.append(rate)
+                open_borrows = Borrow.objects.filter(book_id=ISBN, returned_at__isnull=True).count()
+                ok = ok and open_borrows == 0
+            print(f'{clients:>8} {rates[0]:>18.0f} {rates[1]:>18.0f}')
+        shard_counter(ISBN, 0)
+        ok = ok and Book.objects.get(pk=ISBN).on_loan == 0
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print('correct' if ok else 'INCORRECT')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())